@@ -0,0 +1,173 @@
+import hashlib
+import itertools
+import json
+import os
+import secrets
+import time
+
+from Hellman import MerkleHellman
+from ImageContainer import process_image
+from KeyStore import save_key_store, use_key_store
+from ecdsa.ecdsa_api import get_pub_key_by_prvt_key, sign_digest, verify_signature
+
+
+# Batch encryption and signing of a directory
+# Every file gets its own random IV (a key and IV pair must never encrypt two files in OFB
+# or CTR) and every signature its own random sign secret. The results are appended to a
+# JSON Lines manifest as files complete: the first line describes the batch, the next ones
+# are one record per file, so after a crash the batch resumes from what the manifest holds.
+MANIFEST_NAME = 'manifest.jsonl'
+ENCRYPTED_SUFFIX = '.tfim'
+
+# Label of the receiver's Merkle-Hellman keys and of the signer's public key in the key store
+RECEIVER_LABEL = 'receiver'
+SIGNER_LABEL = 'signer'
+
+
+# The paths of the files under input_dir, relative to it and in a stable order
+def batch_files(input_dir):
+    files = []
+    for root, dirs, names in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(names):
+            files.append(os.path.relpath(os.path.join(root, name), input_dir))
+    return files
+
+
+def read_manifest(path):
+    """
+    The records of a manifest. A last line cut by a crash is removed from the
+    file, so the records appended next start on a line of their own.
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r+b') as file:
+        complete = 0
+        for line in file:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            complete += len(line)
+        file.truncate(complete)
+    return records
+
+
+def append_manifest(file, record):
+    file.write(json.dumps(record, sort_keys=True) + '\n')
+    file.flush()
+    os.fsync(file.fileno())
+
+
+# Runs once in every worker process: expanded keys and point tables come from the key store
+def init_batch_worker(key_store_path):
+    use_key_store(key_store_path)
+
+
+# Encrypts and signs one file in a worker process, the container is hashed while it is
+# written. Returns the manifest record of the file, errors are recorded instead of raised.
+# Files that aren't images are recorded as skipped, a resumed batch doesn't retry them.
+def batch_file(relative_path, input_dir, output_dir, key, private_key, verify, passthrough, mode):
+    from PIL import UnidentifiedImageError
+    start = time.perf_counter()
+    input_path = os.path.join(input_dir, relative_path)
+    output_path = os.path.join(output_dir, relative_path + ENCRYPTED_SUFFIX)
+    try:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        iv = secrets.token_bytes(16)
+        container_hash = hashlib.sha256()
+        process_image("encrypt", key, iv, input_path, output_path, mode=mode, workers=1, hasher=container_hash,
+                      passthrough=passthrough)
+        r, s = sign_digest(container_hash.digest(), private_key, secrets.randbits(256))
+
+        verified = None
+        if verify:
+            verified = verify_signature(output_path, get_pub_key_by_prvt_key(private_key), (r, s))
+
+        return {"file": relative_path, "output": relative_path + ENCRYPTED_SUFFIX,
+                "status": "ok" if verified is not False else "error", "iv": iv.hex(),
+                "sha256": container_hash.hexdigest(), "signature": ["%x" % int(r), "%x" % int(s)],
+                "verified": verified, "bytes": os.path.getsize(input_path),
+                "seconds": round(time.perf_counter() - start, 6)}
+    except UnidentifiedImageError:
+        return {"file": relative_path, "status": "skipped", "error": "Not an image"}
+    except Exception as error:
+        return {"file": relative_path, "status": "error", "error": "%s: %s" % (type(error).__name__, error)}
+
+
+# Whether a file found under input_dir was written by the batch: the manifest, the key store,
+# every file of an output directory inside the input directory, and the containers when the
+# output directory is the input directory itself. Real paths are compared, so links and
+# spellings like '.' and './' don't matter.
+def is_batch_output(relative_path, input_dir, output_dir, key_store_path):
+    path = os.path.realpath(os.path.join(input_dir, relative_path))
+    real_input, real_output = os.path.realpath(input_dir), os.path.realpath(output_dir)
+    if path in (os.path.join(real_output, MANIFEST_NAME), os.path.realpath(key_store_path),
+                os.path.realpath(key_store_path + '.tmp')):
+        return True
+    if real_output == real_input:
+        return path.endswith(ENCRYPTED_SUFFIX)
+    return real_output.startswith(real_input + os.sep) and path.startswith(real_output + os.sep)
+
+
+# Encrypts and signs every file of input_dir into output_dir with a pool of `workers` processes
+# (None is one per CPU). The Twofish key is wrapped once with the receiver's Merkle-Hellman key
+# from the key store; a missing key store is created with fresh Merkle-Hellman keys, the
+# expanded Twofish key and the signer's public key, and must be kept as secret as the keys.
+# Files already done according to the manifest are skipped. Returns the manifest records.
+def batch_process(input_dir, output_dir, key, private_key, key_store_path, workers=None, verify=False,
+                  passthrough=True, mode="ofb"):
+    key = key.zfill(32)
+    public_key = get_pub_key_by_prvt_key(private_key)
+    if not os.path.exists(key_store_path):
+        mh = MerkleHellman([], [])
+        mh.genKeys(secrets.randbelow(10) + 1)
+        save_key_store(key_store_path, [key], {RECEIVER_LABEL: mh}, {SIGNER_LABEL: public_key})
+    store = use_key_store(key_store_path)
+    mh = store.merkle_hellman(RECEIVER_LABEL)
+    if mh is None:
+        raise ValueError("Key store has no Merkle-Hellman keys for the receiver")
+
+    batch = {"type": "batch", "wrapped_key": mh.encryptKey(key, mh.getPublicKey()),
+             "public_key": ["%x" % int(public_key.x), "%x" % int(public_key.y)],
+             "mode": mode, "passthrough": passthrough}
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    records = read_manifest(manifest_path)
+    if records and {name: records[0].get(name) for name in batch} != batch:
+        raise ValueError("The manifest in %s belongs to a batch with other keys or settings" % output_dir)
+
+    done = {record["file"] for record in records[1:]
+            if record.get("status") == "skipped" or
+            record.get("status") == "ok" and os.path.exists(os.path.join(output_dir, record["output"]))}
+    pending = [name for name in batch_files(input_dir)
+               if name not in done and not is_batch_output(name, input_dir, output_dir, key_store_path)]
+
+    with open(manifest_path, 'a', encoding='utf-8') as manifest:
+        if not records:
+            append_manifest(manifest, batch)
+            records.append(batch)
+
+        args = (input_dir, output_dir, key, private_key, verify, passthrough, mode)
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_batch_worker,
+                                 initargs=(key_store_path,)) as pool:
+            # A bounded number of tasks in flight, so a huge directory isn't queued all at once
+            limit = 4 * (workers or os.cpu_count() or 1)
+            names = iter(pending)
+            running = set()
+            while True:
+                for name in itertools.islice(names, limit - len(running)):
+                    running.add(pool.submit(batch_file, name, *args))
+                if not running:
+                    break
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    append_manifest(manifest, record)
+                    records.append(record)
+    return records
@@ -0,0 +1,422 @@
+import mmap
+import os
+import queue
+import struct
+import threading
+from collections import namedtuple
+from itertools import repeat
+
+from Instrumentation import instrumented
+from Twofish import decrypt_block, decrypt_blocks, encrypt_block, encrypt_blocks, encrypt_words, get_context, to_bytes
+
+# Bytes of data handed to one CTR or CBC decryption worker task
+CTR_SHARD_SIZE = 1 << 20
+
+# Size of the chunks moving through the OFB pipeline (a multiple of 16) and how many
+# chunks each pipeline stage may run ahead of the next one
+PIPELINE_CHUNK_SIZE = 1 << 16
+PIPELINE_DEPTH = 8
+
+
+# The keystream is made of whole blocks, chunks of any other size would leave data
+# unencrypted (or, below 16 bytes, never produce any keystream at all)
+def check_chunk_size(chunk_size):
+    if chunk_size <= 0 or chunk_size % 16:
+        raise ValueError("chunk_size must be a positive multiple of 16, got %d" % chunk_size)
+
+
+# XOR of two byte strings of the same length, done as one big integer operation
+def xor_bytes(a, b):
+    if len(a) != len(b):
+        raise ValueError("Can't XOR %d bytes with %d bytes" % (len(a), len(b)))
+    return (int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+
+
+# OFB Mode Encryption on bytes
+@instrumented()
+def ofb_encrypt_bytes(data, key, iv):
+    # The expanded key is shared by every block of the message
+    ctx = get_context(key)
+    words = struct.unpack('<4I', to_bytes(iv))
+
+    # Generate one keystream block per (possibly partial) data block
+    keystream = []
+    for _ in range((len(data) + 15) // 16):
+        words = encrypt_words(ctx, *words)
+        keystream.append(struct.pack('<4I', *words))
+
+    # XOR data with the keystream, a partial last block uses the start of its keystream block
+    return xor_bytes(data, b''.join(keystream)[:len(data)])
+
+
+# OFB Mode Decryption on bytes
+def ofb_decrypt_bytes(data, key, iv):
+    # The process is identical to encryption in OFB mode
+    return ofb_encrypt_bytes(data, key, iv)
+
+
+# OFB Mode Encryption on hex strings
+def ofb_encrypt(plaintext, key, iv):
+    return ofb_encrypt_bytes(bytes.fromhex(plaintext), key, iv).hex()
+
+
+# OFB Mode Decryption on hex strings
+def ofb_decrypt(ciphertext, key, iv):
+    # The process is identical to encryption in OFB mode
+    return ofb_encrypt(ciphertext, key, iv)
+
+
+# PKCS#7 padding: 1 to 16 bytes, each holding the number of bytes added
+def pkcs7_pad(data):
+    n = 16 - len(data) % 16
+    return bytes(data) + bytes([n]) * n
+
+
+def pkcs7_unpad(data):
+    if not data or len(data) % 16:
+        raise ValueError("Invalid PKCS#7 padding")
+    n = data[-1]
+    if not 1 <= n <= 16 or data[-n:] != bytes([n]) * n:
+        raise ValueError("Invalid PKCS#7 padding")
+    return data[:-n]
+
+
+# CBC Mode Encryption on bytes, the data is padded with PKCS#7
+# Every block depends on the previous ciphertext block, so encryption stays serial
+@instrumented()
+def cbc_encrypt_bytes(data, key, iv):
+    ctx = get_context(key)
+    c0, c1, c2, c3 = struct.unpack('<4I', to_bytes(iv))
+
+    ciphertext = []
+    for p0, p1, p2, p3 in struct.iter_unpack('<4I', pkcs7_pad(data)):
+        c0, c1, c2, c3 = encrypt_words(ctx, p0 ^ c0, p1 ^ c1, p2 ^ c2, p3 ^ c3)
+        ciphertext.append(struct.pack('<4I', c0, c1, c2, c3))
+    return b''.join(ciphertext)
+
+
+# Decrypt one shard of a CBC message, `previous` is the ciphertext block before the shard
+# (the IV for the first one). The block decryptions don't depend on each other, so they go
+# through the batched engine when NumPy is there
+def cbc_shard(key, previous, data):
+    ctx = get_context(key)
+    try:
+        decrypted = decrypt_blocks(ctx, data)
+    except ImportError:
+        decrypted = b''.join(decrypt_block(ctx, data[i:i + 16]) for i in range(0, len(data), 16))
+    return xor_bytes(decrypted, previous + data[:-16])
+
+
+# CBC Mode Decryption on bytes, the PKCS#7 padding is removed
+# The ciphertext is cut in shards of CTR_SHARD_SIZE bytes which are decrypted in a process
+# pool of `workers` processes (None is one per CPU, 1 runs everything in this process)
+@instrumented()
+def cbc_decrypt_bytes(data, key, iv, workers=None):
+    key = to_bytes(key)
+    iv = to_bytes(iv)
+    if len(data) % 16:
+        raise ValueError("CBC ciphertext must be a multiple of 16 bytes")
+
+    starts = range(0, len(data), CTR_SHARD_SIZE)
+    previous = [iv] + [bytes(data[start - 16:start]) for start in starts[1:]]
+    shards = [bytes(data[start:start + CTR_SHARD_SIZE]) for start in starts]
+
+    if workers == 1 or len(shards) <= 1:
+        return pkcs7_unpad(b''.join(map(cbc_shard, repeat(key), previous, shards)))
+
+    from concurrent.futures import ProcessPoolExecutor  # only loaded when a pool is used
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return pkcs7_unpad(b''.join(pool.map(cbc_shard, repeat(key), previous, shards)))
+
+
+# CBC Mode Encryption on hex strings
+def cbc_encrypt(plaintext, key, iv):
+    return cbc_encrypt_bytes(bytes.fromhex(plaintext), key, iv).hex()
+
+
+# CBC Mode Decryption on hex strings
+def cbc_decrypt(ciphertext, key, iv, workers=None):
+    return cbc_decrypt_bytes(bytes.fromhex(ciphertext), key, iv, workers).hex()
+
+
+# OFB state recorded every `interval` blocks: states[j] is the cipher input of block
+# j * interval (states[0] is the IV), keystream can be restarted from any of them
+Checkpoints = namedtuple('Checkpoints', ['interval', 'states'])
+
+
+class OFBKeystream:
+    """
+    OFB keystream produced on demand: every blocks(n) call returns the next n
+    keystream blocks, so only the blocks the data needs are ever encrypted.
+    When a Checkpoints is given its states list is filled as the blocks are
+    produced.
+    """
+
+    def __init__(self, key, iv, checkpoints=None):
+        self.ctx = get_context(key)
+        self.words = struct.unpack('<4I', to_bytes(iv))
+        self.checkpoints = checkpoints
+        self.block = 0
+
+    @instrumented("ofb_keystream")
+    def blocks(self, n):
+        ctx, words, checkpoints = self.ctx, self.words, self.checkpoints
+        chunk = []
+        for block in range(self.block, self.block + n):
+            if checkpoints is not None and block % checkpoints.interval == 0:
+                checkpoints.states.append(struct.pack('<4I', *words))
+            words = encrypt_words(ctx, *words)
+            chunk.append(struct.pack('<4I', *words))
+        self.words = words
+        self.block += n
+        return b''.join(chunk)
+
+
+# OFB Mode keystream as an endless sequence of chunk_size byte chunks (a multiple of 16)
+# When a Checkpoints is given its states list is filled while the keystream is produced
+def ofb_keystream(key, iv, chunk_size=PIPELINE_CHUNK_SIZE, checkpoints=None):
+    check_chunk_size(chunk_size)
+    keystream = OFBKeystream(key, iv, checkpoints)
+    while True:
+        yield keystream.blocks(chunk_size // 16)
+
+
+# Pairs data chunks of any size with as many bytes of an OFBKeystream. Only the blocks a
+# chunk needs are asked for, at most max_blocks at a time; the rest of a partial block is
+# kept for the next chunk
+def keystream_chunks(chunks, keystream, max_blocks=PIPELINE_CHUNK_SIZE // 16):
+    pending = b''
+    for chunk in chunks:
+        parts = [pending]
+        available = len(pending)
+        while available < len(chunk):
+            part = keystream.blocks(min((len(chunk) - available + 15) // 16, max_blocks))
+            parts.append(part)
+            available += len(part)
+        pending = b''.join(parts)
+
+        yield chunk, pending[:len(chunk)]
+        pending = pending[len(chunk):]
+
+
+# XOR data chunks of any size with the bytes of an OFBKeystream
+def xor_stream(chunks, keystream, max_blocks=PIPELINE_CHUNK_SIZE // 16):
+    for chunk, stream in keystream_chunks(chunks, keystream, max_blocks):
+        yield xor_bytes(chunk, stream)
+
+
+# Chunks of a binary file-like object (read chunk_size bytes at a time) or of an iterator
+def read_chunks(source, chunk_size=PIPELINE_CHUNK_SIZE):
+    if not hasattr(source, 'read'):
+        yield from source
+        return
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+# OFB Mode Encryption of a stream
+# `source` is a binary file-like object or an iterator of byte chunks, the encrypted chunks
+# are yielded as they are ready and the OFB state is carried from one chunk to the next,
+# so memory stays a few chunks no matter how large the input is
+def ofb_encrypt_stream(source, key, iv, chunk_size=PIPELINE_CHUNK_SIZE, checkpoints=None):
+    check_chunk_size(chunk_size)
+    return xor_stream(read_chunks(source, chunk_size), OFBKeystream(key, iv, checkpoints), chunk_size // 16)
+
+
+# OFB Mode Decryption of a stream
+def ofb_decrypt_stream(source, key, iv, chunk_size=PIPELINE_CHUNK_SIZE):
+    # The process is identical to encryption in OFB mode
+    return ofb_encrypt_stream(source, key, iv, chunk_size)
+
+
+class Prefetch:
+    """
+    Iterates over `iterable` in a background thread that keeps at most `depth`
+    items ready in a bounded queue. The thread starts at construction, so the
+    work begins before the consumer asks for the first item.
+    """
+
+    def __init__(self, iterable, depth=PIPELINE_DEPTH):
+        self.items = queue.Queue(maxsize=depth)
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._produce, args=(iterable,), daemon=True)
+        self.thread.start()
+
+    def _put(self, item):
+        # Gives up when the consumer is gone so an endless producer doesn't block forever
+        while not self.stop.is_set():
+            try:
+                self.items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self, iterable):
+        try:
+            for item in iterable:
+                if not self._put((True, item)):
+                    return
+            self._put((False, None))
+        except BaseException as error:
+            self._put((False, error))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        has_item, item = self.items.get()
+        if not has_item:
+            self.stop.set()
+            if item is not None:
+                raise item
+            raise StopIteration
+        return item
+
+    def close(self):
+        self.stop.set()
+
+    def __del__(self):
+        self.close()
+
+
+# OFB Mode Encryption as a pipeline: a thread reads the input chunks, another one produces
+# the keystream of each chunk as soon as it is read (ahead of the XOR, never ahead of the
+# data), and the caller's loop does the XOR and the write.
+# Returns an iterator over the encrypted chunks, the result is the same as ofb_encrypt_bytes
+def ofb_pipeline(chunks, key, iv, chunk_size=PIPELINE_CHUNK_SIZE, depth=PIPELINE_DEPTH, checkpoints=None):
+    check_chunk_size(chunk_size)
+    reader = Prefetch(chunks, depth)
+    keyed = Prefetch(keystream_chunks(reader, OFBKeystream(key, iv, checkpoints), chunk_size // 16), depth)
+
+    def xor_stage():
+        try:
+            for chunk, stream in keyed:
+                yield xor_bytes(chunk, stream)
+        finally:
+            keyed.close()
+            reader.close()
+
+    return xor_stage()
+
+
+# Memory-mapped OFB encryption of any file
+# The source and destination are mapped and every chunk of keystream is XORed straight
+# into the mapped pages front to back, without loading the file into Python objects.
+# Without output_path (or when it is the input file) the file is encrypted in place.
+# Decryption is the same call.
+def ofb_encrypt_file(input_path, key, iv, output_path=None, chunk_size=PIPELINE_CHUNK_SIZE):
+    check_chunk_size(chunk_size)
+    size = os.path.getsize(input_path)
+
+    # Opening the input as the output would truncate it before it is mapped
+    if output_path is not None and os.path.exists(output_path) and os.path.samefile(input_path, output_path):
+        output_path = None
+
+    if output_path is None:
+        src_file = dst_file = open(input_path, 'r+b')
+    else:
+        src_file = open(input_path, 'rb')
+        dst_file = open(output_path, 'w+b')
+        dst_file.truncate(size)
+
+    try:
+        # Empty files can't be mapped and there is nothing to encrypt
+        if size == 0:
+            return
+
+        dst = mmap.mmap(dst_file.fileno(), size, access=mmap.ACCESS_WRITE)
+        src = dst if output_path is None else mmap.mmap(src_file.fileno(), size, access=mmap.ACCESS_READ)
+        try:
+            # Sequential access: the kernel reads ahead and can free pages once they are passed
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                src.madvise(mmap.MADV_SEQUENTIAL)
+                dst.madvise(mmap.MADV_SEQUENTIAL)
+
+            keystream = OFBKeystream(key, iv)
+            for start in range(0, size, chunk_size):
+                end = min(start + chunk_size, size)
+                dst[start:end] = xor_bytes(src[start:end], keystream.blocks((end - start + 15) // 16)[:end - start])
+            dst.flush()
+        finally:
+            if src is not dst:
+                src.close()
+            dst.close()
+    finally:
+        src_file.close()
+        if dst_file is not src_file:
+            dst_file.close()
+
+
+# Memory-mapped OFB decryption of any file
+def ofb_decrypt_file(input_path, key, iv, output_path=None, chunk_size=PIPELINE_CHUNK_SIZE):
+    # The process is identical to encryption in OFB mode
+    ofb_encrypt_file(input_path, key, iv, output_path, chunk_size)
+
+
+# CTR Mode keystream for the counter blocks first_block .. first_block + n_blocks - 1
+# Counter block i is the IV read as a 128-bit big endian number plus i (mod 2^128)
+@instrumented()
+def ctr_keystream(key, iv, first_block, n_blocks):
+    ctx = get_context(key)
+    counter = int.from_bytes(to_bytes(iv), 'big') + first_block
+    counters = b''.join(((counter + i) % (1 << 128)).to_bytes(16, 'big') for i in range(n_blocks))
+
+    # The counter blocks are independent, so they go through the batched engine when NumPy is there
+    try:
+        return encrypt_blocks(ctx, counters)
+    except ImportError:
+        return b''.join(encrypt_block(ctx, counters[i:i + 16]) for i in range(0, len(counters), 16))
+
+
+# Encrypt one shard of a CTR message, first_block is the block index where the shard starts
+def ctr_shard(key, iv, first_block, data):
+    keystream = ctr_keystream(key, iv, first_block, (len(data) + 15) // 16)
+    return xor_bytes(data, keystream[:len(data)])
+
+
+# CTR Mode Encryption on bytes
+# The data is cut in shards of CTR_SHARD_SIZE bytes which are encrypted in a process pool
+# of `workers` processes (None is one per CPU, 1 runs everything in this process)
+def ctr_encrypt_bytes(data, key, iv, workers=None):
+    key = to_bytes(key)
+    iv = to_bytes(iv)
+
+    starts = range(0, len(data), CTR_SHARD_SIZE)
+    first_blocks = [start // 16 for start in starts]
+    shards = [data[start:start + CTR_SHARD_SIZE] for start in starts]
+
+    if workers == 1 or len(shards) <= 1:
+        return b''.join(map(ctr_shard, repeat(key), repeat(iv), first_blocks, shards))
+
+    # map keeps the order of the shards, so the results are joined back in place
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return b''.join(pool.map(ctr_shard, repeat(key), repeat(iv), first_blocks, shards))
+
+
+# CTR Mode Decryption on bytes
+def ctr_decrypt_bytes(data, key, iv, workers=None):
+    # The process is identical to encryption in CTR mode
+    return ctr_encrypt_bytes(data, key, iv, workers)
+
+
+# # Main Program
+# typ = input("Enter the type (Encrypt/Decrypt) : ")
+# key = input("Enter the key 128 bit (Hexadecimal) : ")
+# key = key.zfill(32)
+# iv = input("Enter the IV 128 bit (Hexadecimal) : ")
+# iv = iv.zfill(32)
+#
+# if typ.lower() == "encrypt":
+#     plaintext = input("Enter the plaintext (Hexadecimal) : ")
+#     plaintext = plaintext.zfill(32 * ((len(plaintext) + 31) // 32))  # Pad plaintext to be multiple of 128 bits
+#     print("The Ciphertext is : ", end=" ")
+#     print(ofb_encrypt(plaintext, key, iv))
+# else:
+#     ciphertext = input("Enter the Ciphertext (Hexadecimal) : ")
+#     print("The Decoded plaintext is : ", end=" ")
+#     print(ofb_decrypt(ciphertext, key, iv))
@@ -0,0 +1,332 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import secrets
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from ImageContainer import CIPHER_MODES, CONTAINER_FLAG_FILE, process_image, read_container_header
+from KeyStore import use_key_store
+from Twofish import to_bytes
+from ecdsa.ecdsa_api import public_key_point, sign_digest, verify_digest
+
+# Protocol
+# A connection carries any number of requests, one after the other. A request is a JSON
+# header on one line followed by exactly header["length"] bytes of body; the response has
+# the same shape. Headers are utf-8 and at most MAX_HEADER_SIZE bytes.
+#   encrypt  key, [iv], [mode], [passthrough], [signing_key]   body: image file -> container
+#   decrypt  key                                                body: container  -> image
+#   sign     signing_key                                        body: data       -> signature
+#   verify   public_key [x, y], signature [r, s]                body: data       -> verified
+# Keys, IVs and signature numbers are hex strings. Responses have "status" ("ok" or "error").
+MAX_HEADER_SIZE = 1 << 16
+STREAM_CHUNK_SIZE = 1 << 16
+
+# Uploads read at the same time, further connections wait (and so do their clients)
+MAX_UPLOADS = 16
+
+# Largest body accepted
+MAX_BODY_SIZE = 1 << 30
+
+OPERATIONS = ("encrypt", "decrypt", "sign", "verify")
+
+
+class RequestError(Exception):
+    pass
+
+
+# Jobs run in the worker processes. A worker lives as long as the server, so the expanded keys
+# in its get_context cache and the point tables stay warm from one request to the next.
+
+def init_server_worker(key_store_path):
+    if key_store_path is not None:
+        use_key_store(key_store_path)
+
+
+def encrypt_job(key, iv, mode, passthrough, signing_key, input_path, output_path):
+    container_hash = hashlib.sha256()
+    process_image("encrypt", key, iv, input_path, output_path, mode=mode, workers=1, hasher=container_hash,
+                  passthrough=passthrough)
+    result = {"iv": iv.hex(), "sha256": container_hash.hexdigest()}
+    if signing_key is not None:
+        r, s = sign_digest(container_hash.digest(), signing_key, secrets.randbits(256))
+        result["signature"] = ["%x" % int(r), "%x" % int(s)]
+    return result
+
+
+def decrypt_job(key, input_path, output_path):
+    with open(input_path, 'rb') as file:
+        header = read_container_header(file)
+    if header.flags & CONTAINER_FLAG_FILE:
+        # The original file is written back as it was
+        process_image("decrypt", key, header.iv, input_path, output_path)
+        return {"format": "file"}
+
+    # Decoded pixels are sent raw, the header tells how to rebuild the image
+    img = process_image("decrypt", key, header.iv, input_path, None)
+    with open(output_path, 'wb') as file:
+        file.write(img.tobytes())
+    return {"format": "raw", "image_mode": header.image_mode, "width": header.width, "height": header.height}
+
+
+def sign_job(digest, signing_key):
+    r, s = sign_digest(digest, signing_key, secrets.randbits(256))
+    return {"signature": ["%x" % int(r), "%x" % int(s)]}
+
+
+def verify_job(digest, public_key, signature):
+    public_key = public_key_point(*public_key)
+    return {"verified": bool(verify_digest(digest, public_key, signature))}
+
+
+def hex_number(header, name):
+    try:
+        return int(header[name], 16)
+    except (KeyError, TypeError, ValueError):
+        raise RequestError("%s must be a hex string" % name)
+
+
+# A 128-bit key as the hex string the cipher takes, longer keys are refused instead of truncated
+def hex_key(header, name):
+    number = hex_number(header, name)
+    if number >> 128:
+        raise RequestError("%s must be at most 128 bits" % name)
+    return "%032x" % number
+
+
+# A 16 byte block (an IV) given as hex, shorter strings are zero padded like to_bytes does
+def hex_block(header, name):
+    value = header.get(name)
+    try:
+        block = to_bytes(value) if isinstance(value, str) else None
+    except ValueError:
+        block = None
+    if block is None or len(block) != 16:
+        raise RequestError("%s must be a hex string of at most 16 bytes" % name)
+    return block
+
+
+def hex_pair(header, name):
+    value = header.get(name)
+    if not isinstance(value, list) or len(value) != 2:
+        raise RequestError("%s must be a list of two hex strings" % name)
+    return hex_number({name: value[0]}, name), hex_number({name: value[1]}, name)
+
+
+class CryptoServer:
+    """
+    asyncio service for encryption, decryption, signing and verification.
+
+    Request bodies are streamed to temporary files (or hashed) as they arrive, a
+    chunk at a time, so a slow consumer of the body holds back the client instead
+    of filling memory; at most max_uploads bodies are read at once. Cipher and EC
+    work runs in a process pool of `workers` processes (None is one per CPU)
+    started with the server, optionally warmed from a key store.
+    """
+
+    def __init__(self, workers=None, key_store_path=None, temp_dir=None, max_uploads=MAX_UPLOADS,
+                 max_body_size=MAX_BODY_SIZE):
+        self.workers = workers
+        self.key_store_path = key_store_path
+        self.temp_dir = temp_dir
+        self.max_body_size = max_body_size
+        self.uploads = asyncio.Semaphore(max_uploads)
+        self.pool = None
+        self.server = None
+
+    async def start_unix(self, path):
+        self._start_pool()
+        self.server = await asyncio.start_unix_server(self.handle, path=path, limit=MAX_HEADER_SIZE)
+        return self.server
+
+    async def start_tcp(self, host='127.0.0.1', port=0):
+        self._start_pool()
+        self.server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_SIZE)
+        return self.server
+
+    def _start_pool(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_server_worker,
+                                        initargs=(self.key_store_path,))
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    async def run_job(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, function, *args)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    header = json.loads(line)
+                    length = header["length"]
+                    if not isinstance(length, int) or not 0 <= length <= self.max_body_size:
+                        raise ValueError
+                except (ValueError, KeyError, TypeError):
+                    # The end of the body can't be found, the connection can't go on
+                    await self.respond(writer, {"status": "error", "error": "Malformed request header"})
+                    break
+
+                try:
+                    response, output_path = await self.dispatch(header, reader, length)
+                except RequestError as error:
+                    response, output_path = {"status": "error", "error": str(error)}, None
+                except Exception as error:
+                    response, output_path = {"status": "error", "error": "%s: %s" % (type(error).__name__, error)}, None
+                try:
+                    await self.respond(writer, response, output_path)
+                finally:
+                    if output_path is not None:
+                        os.remove(output_path)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # The client went away in the middle of a request, or sent a header line that is too long
+            pass
+        except asyncio.CancelledError:
+            # The server is shutting down, the connection is just closed
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, response, output_path=None):
+        response = dict(response)
+        response["length"] = os.path.getsize(output_path) if output_path is not None else 0
+        writer.write(json.dumps(response).encode() + b'\n')
+        await writer.drain()
+        if output_path is not None:
+            with open(output_path, 'rb') as file:
+                for chunk in iter(lambda: file.read(STREAM_CHUNK_SIZE), b''):
+                    writer.write(chunk)
+                    # Waits while the client's receive buffer is full
+                    await writer.drain()
+
+    async def read_body(self, reader, length, sink):
+        async with self.uploads:
+            while length > 0:
+                chunk = await reader.readexactly(min(STREAM_CHUNK_SIZE, length))
+                sink(chunk)
+                length -= len(chunk)
+
+    async def spool_body(self, reader, length):
+        # The body goes to a temporary file, the worker processes read it from there
+        fd, path = tempfile.mkstemp(dir=self.temp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                await self.read_body(reader, length, file.write)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
+
+    async def hash_body(self, reader, length):
+        body_hash = hashlib.sha256()
+        await self.read_body(reader, length, body_hash.update)
+        return body_hash.digest()
+
+    def temp_path(self):
+        fd, path = tempfile.mkstemp(dir=self.temp_dir)
+        os.close(fd)
+        return path
+
+    # Reads the body of one request and runs it, returns the response header and the path of
+    # the response body (None when there is none)
+    async def dispatch(self, header, reader, length):
+        op = header.get("op")
+        try:
+            if op not in OPERATIONS:
+                raise RequestError("Unknown operation: %s" % op)
+            args = self.parse_arguments(op, header)
+        except Exception:
+            # The body is skipped so the next request starts where it should, whatever was
+            # wrong with the header
+            await self.read_body(reader, length, lambda chunk: None)
+            raise
+
+        if op in ("sign", "verify"):
+            digest = await self.hash_body(reader, length)
+            if op == "sign":
+                return dict(await self.run_job(sign_job, digest, *args), status="ok"), None
+            return dict(await self.run_job(verify_job, digest, *args), status="ok"), None
+
+        input_path = await self.spool_body(reader, length)
+        output_path = self.temp_path()
+        try:
+            if op == "encrypt":
+                result = await self.run_job(encrypt_job, *args, input_path, output_path)
+            else:
+                result = await self.run_job(decrypt_job, *args, input_path, output_path)
+        except BaseException:
+            os.remove(output_path)
+            raise
+        finally:
+            os.remove(input_path)
+        return dict(result, status="ok"), output_path
+
+    def parse_arguments(self, op, header):
+        if op == "encrypt":
+            mode = header.get("mode", "ofb")
+            if mode not in CIPHER_MODES:
+                raise RequestError("Unknown cipher mode: %s" % mode)
+            # A fresh IV for every request unless the client picks one
+            iv = hex_block(header, "iv") if header.get("iv") else secrets.token_bytes(16)
+            signing_key = hex_number(header, "signing_key") if header.get("signing_key") else None
+            return hex_key(header, "key"), iv, mode, bool(header.get("passthrough", True)), signing_key
+        if op == "decrypt":
+            return (hex_key(header, "key"),)
+        if op == "sign":
+            return (hex_number(header, "signing_key"),)
+        return hex_pair(header, "public_key"), hex_pair(header, "signature")
+
+
+async def request(reader, writer, header, body=b''):
+    """Client side: sends one request and returns the response header and body."""
+    header = dict(header, length=len(body))
+    writer.write(json.dumps(header).encode() + b'\n')
+    for i in range(0, len(body), STREAM_CHUNK_SIZE):
+        writer.write(body[i:i + STREAM_CHUNK_SIZE])
+        await writer.drain()
+    await writer.drain()
+
+    response = json.loads(await reader.readline())
+    return response, await reader.readexactly(response["length"])
+
+
+async def serve(args):
+    server = CryptoServer(args.workers, args.key_store, args.temp_dir)
+    if args.unix:
+        await server.start_unix(args.unix)
+        print("Listening on %s" % args.unix)
+    else:
+        listener = await server.start_tcp(args.host, args.port)
+        print("Listening on %s:%d" % listener.sockets[0].getsockname()[:2])
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local encryption, decryption, signing and verification service")
+    parser.add_argument("--unix", help="Unix socket path (instead of TCP)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--key-store", default=None, help="key material store to warm the workers with")
+    parser.add_argument("--temp-dir", default=None, help="directory of the spooled request bodies")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
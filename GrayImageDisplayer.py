@@ -1,11 +1,9 @@
-from PIL import Image
+def show_image(image, convert_to_gray=False):
+    from PIL import Image  # loaded on first use, importing this module stays cheap
 
-
-from PIL import Image
-
-def show_image(image_path, convert_to_gray=False):
-    # Open image
-    image = Image.open(image_path)
+    # Accepts a path or an already loaded PIL Image (e.g. the one process_image returns)
+    if not isinstance(image, Image.Image):
+        image = Image.open(image)
 
     # Optionally convert to grayscale
     if convert_to_gray:
@@ -40,20 +40,23 @@
 
 
 import random
-from gmpy2 import invert
 import time
 
+from Instrumentation import instrumented
+
 MAX_CHARS = 32
 BINARY_LENGTH = MAX_CHARS * 8
 
 
 class MerkleHellman:
 
-    def __init__(self, b=[], w=[], q=0, r=0):
+    def __init__(self, b=[], w=[], q=0, r=0, r_inverse=None):
         self.b = b
         self.w = w
         self.q = q
         self.r = r
+        # invert(r, q), computed once with the keys and reused by decryptKey
+        self.r_inverse = r_inverse
 
     def getPublicKey(self):
         return self.b
@@ -72,10 +75,13 @@ class MerkleHellman:
 
         self.q = sum + randomNumber
         self.r = self.q - 1
+        from gmpy2 import invert  # gmpy2 is only loaded when keys are made or used
+        self.r_inverse = int(invert(self.r, self.q))
         for i in range(BINARY_LENGTH):
             self.b.append((self.w[i] * self.r) % self.q)
 
     # @profile
+    @instrumented("merkle_hellman_wrap")
     def encryptKey(self, message, publicKey):
 
         if len(message) > MAX_CHARS:
@@ -95,12 +101,18 @@ class MerkleHellman:
 
         return str(result)
 
+    @instrumented("merkle_hellman_unwrap")
     def decryptKey(self, ciphertext, w, q, r):
 
         decrypted_binary = ''
         ciphertext = int(ciphertext)
 
-        tmp = (ciphertext * invert(r, q)) % q
+        if self.r_inverse is not None and (q, r) == (self.q, self.r):
+            r_inverse = self.r_inverse
+        else:
+            from gmpy2 import invert
+            r_inverse = invert(r, q)
+        tmp = (ciphertext * r_inverse) % q
 
         for i in range(len(w) - 1, -1, -1):
             if w[i] <= tmp:
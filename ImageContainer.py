@@ -0,0 +1,544 @@
+import binascii
+import hashlib
+import io
+import os
+import struct
+from collections import namedtuple
+from itertools import repeat
+
+from CipherModes import (Checkpoints, PIPELINE_CHUNK_SIZE, ctr_encrypt_bytes, ctr_keystream, ofb_encrypt_bytes,
+                         ofb_encrypt_stream, ofb_keystream, ofb_pipeline, read_chunks, xor_bytes)
+from Instrumentation import instrumented
+from Twofish import decrypt_block, encrypt_block, get_context, to_bytes
+
+
+# Define global variables for size and mode
+global_image_size = None
+global_image_mode = None
+
+
+# Your existing encryption/decryption functions here...
+
+@instrumented()
+def image_to_bytes(image_path):
+    """Convert image to its raw pixel bytes."""
+    from PIL import Image  # PIL is only loaded by the functions that handle images
+    global global_image_size, global_image_mode
+    with Image.open(image_path) as img:
+        # Store size and mode in global variables
+        global_image_size = img.size
+        global_image_mode = img.mode
+        return img.tobytes()
+
+
+@instrumented()
+def bytes_to_image(img_bytes, output_path):
+    """Convert raw pixel bytes back to an image using global size and mode."""
+    from PIL import Image
+    global global_image_size, global_image_mode
+    img = Image.frombytes(global_image_mode, global_image_size, img_bytes)
+    img.save(output_path)
+
+
+@instrumented()
+def image_to_hex(image_path):
+    """Convert image to a hexadecimal string."""
+    return binascii.hexlify(image_to_bytes(image_path)).decode('utf-8')
+
+
+@instrumented()
+def hex_to_image(hex_str, output_path):
+    """Convert hexadecimal string back to an image using global size and mode."""
+    bytes_to_image(binascii.unhexlify(hex_str), output_path)
+
+
+def image_chunks(image_path, chunk_size=PIPELINE_CHUNK_SIZE):
+    """Decode an image and yield its raw pixel bytes in chunks."""
+    img_bytes = memoryview(image_to_bytes(image_path))
+    for i in range(0, len(img_bytes), chunk_size):
+        yield img_bytes[i:i + chunk_size]
+
+
+def file_chunks(path, chunk_size=PIPELINE_CHUNK_SIZE):
+    """Yield the bytes of a file, as they are stored on disk, in chunks."""
+    with open(path, 'rb') as file:
+        yield from read_chunks(file, chunk_size)
+
+
+def row_size(image_mode, width):
+    """Number of bytes of one pixel row in the raw buffer of an image mode."""
+    if image_mode == '1':
+        # Bilevel images pack 8 pixels in a byte
+        return (width + 7) // 8
+    from PIL import ImageMode
+    mode = ImageMode.getmode(image_mode)
+    return width * len(mode.bands) * int(mode.typestr[2:])
+
+
+# Encrypted image container
+# A fixed little endian header followed by the raw ciphertext bytes:
+#   magic (4s) version (B) flags (B) image mode (8s) width (I) height (I)
+#   cipher mode (B) IV (16s) payload length (Q)
+CONTAINER_MAGIC = b'TFIM'
+CONTAINER_VERSION = 1
+CONTAINER_HEADER = struct.Struct('<4sBB8sIIB16sQ')
+CIPHER_MODES = {"ofb": 1, "ctr": 2}
+
+# Header flag: an OFB checkpoint index follows the payload
+CONTAINER_FLAG_CHECKPOINTS = 0x01
+
+# Header flag: the payload is the original image file (as stored on disk) instead of the
+# decoded pixels, the mode and size fields only describe the image
+CONTAINER_FLAG_FILE = 0x04
+
+ContainerHeader = namedtuple('ContainerHeader',
+                             ['flags', 'image_mode', 'width', 'height', 'cipher_mode', 'iv', 'payload_length'])
+
+
+def pack_container_header(header):
+    return CONTAINER_HEADER.pack(CONTAINER_MAGIC, CONTAINER_VERSION, header.flags, header.image_mode.encode('ascii'),
+                                 header.width, header.height, CIPHER_MODES[header.cipher_mode], header.iv,
+                                 header.payload_length)
+
+
+def read_container_header(file):
+    raw = file.read(CONTAINER_HEADER.size)
+    if len(raw) != CONTAINER_HEADER.size:
+        raise ValueError("Truncated container header")
+
+    magic, version, flags, image_mode, width, height, cipher_mode, iv, payload_length = CONTAINER_HEADER.unpack(raw)
+    if magic != CONTAINER_MAGIC:
+        raise ValueError("Not an encrypted image container")
+    if version != CONTAINER_VERSION:
+        raise ValueError("Unsupported container version: %d" % version)
+
+    cipher_names = {number: name for name, number in CIPHER_MODES.items()}
+    if cipher_mode not in cipher_names:
+        raise ValueError("Unknown cipher mode in container: %d" % cipher_mode)
+
+    return ContainerHeader(flags, image_mode.rstrip(b'\0').decode('ascii'), width, height,
+                           cipher_names[cipher_mode], iv, payload_length)
+
+
+def read_payload(file, length, chunk_size=PIPELINE_CHUNK_SIZE):
+    """Yield exactly `length` bytes of a file in chunks."""
+    while length > 0:
+        chunk = file.read(min(chunk_size, length))
+        if not chunk:
+            raise ValueError("Truncated container payload")
+        length -= len(chunk)
+        yield chunk
+
+
+# OFB checkpoint index
+# Stored right after the payload: interval (I) and count (I), then `count` 16 byte states.
+# A state is enough to regenerate the rest of the keystream, so each one is encrypted with
+# a key derived from the file key by encrypting CHECKPOINT_KEY_LABEL under it.
+CHECKPOINT_INDEX = struct.Struct('<II')
+CHECKPOINT_KEY_LABEL = b'OFB checkpoints\0'
+
+# Default number of blocks between two checkpoints (64 KiB of payload)
+CHECKPOINT_INTERVAL = 4096
+
+
+def checkpoint_context(key):
+    return get_context(encrypt_block(get_context(key), CHECKPOINT_KEY_LABEL))
+
+
+def pack_checkpoint_index(key, checkpoints, payload_length):
+    # The keystream may run ahead of the payload, only states of blocks in the payload are kept
+    blocks = (payload_length + 15) // 16
+    states = checkpoints.states[:(blocks + checkpoints.interval - 1) // checkpoints.interval]
+
+    ctx = checkpoint_context(key)
+    return (CHECKPOINT_INDEX.pack(checkpoints.interval, len(states)) +
+            b''.join(encrypt_block(ctx, state) for state in states))
+
+
+# Reads the interval and count of a checkpoint index, the file is left at its first state
+def read_checkpoint_header(file, header):
+    file.seek(CONTAINER_HEADER.size + header.payload_length)
+    raw = file.read(CHECKPOINT_INDEX.size)
+    if len(raw) != CHECKPOINT_INDEX.size:
+        raise ValueError("Truncated checkpoint index")
+    interval, count = CHECKPOINT_INDEX.unpack(raw)
+    if interval == 0:
+        raise ValueError("Invalid checkpoint interval")
+    return interval, count
+
+
+def read_checkpoint_index(file, header, key):
+    interval, count = read_checkpoint_header(file, header)
+    raw = file.read(16 * count)
+    if len(raw) != 16 * count:
+        raise ValueError("Truncated checkpoint index")
+    ctx = checkpoint_context(key)
+    return Checkpoints(interval, [decrypt_block(ctx, raw[i:i + 16]) for i in range(0, len(raw), 16)])
+
+
+# The checkpoint nearest before (or at) `block`, returns its state and the block it starts.
+# Only that state is read and decrypted, the cost doesn't grow with the size of the file
+def read_checkpoint(file, header, key, block):
+    interval, count = read_checkpoint_header(file, header)
+    if count == 0:
+        return header.iv, 0
+    j = min(block // interval, count - 1)
+    file.seek(16 * j, io.SEEK_CUR)
+    raw = file.read(16)
+    if len(raw) != 16:
+        raise ValueError("Truncated checkpoint index")
+    return decrypt_block(checkpoint_context(key), raw), j * interval
+
+
+# Tiled OFB
+# The pixel buffer is cut in bands of `rows` pixel rows and each band is an OFB stream of its
+# own, so the bands are encrypted in parallel and one band can be changed without touching
+# the others. Band i starts from an IV derived from the master IV, i and the generation of the
+# band (bumped every time the band is re-encrypted, so a keystream is never used twice).
+# The tile table is stored right after the payload: rows (I) and count (I), then `count`
+# generations (I).
+TILE_TABLE = struct.Struct('<II')
+TILE_GENERATION = struct.Struct('<I')
+TILE_KEY_LABEL = b'OFB tiles\0\0\0\0\0\0\0'
+
+# Header flag: the payload is made of tiles and a tile table follows it
+CONTAINER_FLAG_TILES = 0x02
+
+TileLayout = namedtuple('TileLayout', ['rows', 'generations'])
+
+
+def tile_count(height, rows):
+    return (height + rows - 1) // rows
+
+
+def tile_context(key):
+    return get_context(encrypt_block(get_context(key), TILE_KEY_LABEL))
+
+
+# The IV of a tile is E(iv XOR (index, generation)) under the tile key, every
+# (index, generation) pair gets a distinct IV
+def tile_iv(key, iv, index, generation):
+    return encrypt_block(tile_context(key), xor_bytes(to_bytes(iv), struct.pack('<QI4x', index, generation)))
+
+
+# Encrypt one tile, decryption is the same operation
+def ofb_tile(key, iv, index, generation, data):
+    return ofb_encrypt_bytes(data, key, tile_iv(key, iv, index, generation))
+
+
+# OFB Mode Encryption of a pixel buffer tile by tile in a process pool of `workers`
+# processes (None is one per CPU, 1 runs everything in this process)
+# stride is the size of a pixel row, returns the list of encrypted tiles
+def ofb_encrypt_tiles(data, key, iv, stride, layout, workers=None):
+    key = to_bytes(key)
+    iv = to_bytes(iv)
+
+    size = layout.rows * stride
+    tiles = [data[start:start + size] for start in range(0, len(data), size)]
+    if len(tiles) != len(layout.generations):
+        raise ValueError("Tile table doesn't match the image size")
+
+    args = (repeat(key), repeat(iv), range(len(tiles)), layout.generations, tiles)
+    if workers == 1 or len(tiles) <= 1:
+        return list(map(ofb_tile, *args))
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(ofb_tile, *args))
+
+
+# OFB Mode Decryption tile by tile
+def ofb_decrypt_tiles(data, key, iv, stride, layout, workers=None):
+    # The process is identical to encryption in OFB mode
+    return ofb_encrypt_tiles(data, key, iv, stride, layout, workers)
+
+
+def pack_tile_table(layout):
+    return (TILE_TABLE.pack(layout.rows, len(layout.generations)) +
+            b''.join(TILE_GENERATION.pack(generation) for generation in layout.generations))
+
+
+# Reads a tile table at the current position of the file
+def read_tile_table(file, header):
+    raw = file.read(TILE_TABLE.size)
+    if len(raw) != TILE_TABLE.size:
+        raise ValueError("Truncated tile table")
+    rows, count = TILE_TABLE.unpack(raw)
+    if rows == 0 or count != tile_count(header.height, rows):
+        raise ValueError("Tile table doesn't match the image size")
+
+    raw = file.read(TILE_GENERATION.size * count)
+    if len(raw) != TILE_GENERATION.size * count:
+        raise ValueError("Truncated tile table")
+    return TileLayout(rows, [generation for generation, in TILE_GENERATION.iter_unpack(raw)])
+
+
+# Replaces the pixel rows of one tile of an encrypted image, only that tile is encrypted
+# again. `image` holds the new rows: same mode and width as the container, and as many
+# rows as the tile (the last tile may be shorter than the others)
+def update_tile(path, key, index, image):
+    key = to_bytes(key)
+    with open(path, 'r+b') as file:
+        header = read_container_header(file)
+        if not header.flags & CONTAINER_FLAG_TILES:
+            raise ValueError("Container is not tiled")
+        file.seek(CONTAINER_HEADER.size + header.payload_length)
+        layout = read_tile_table(file, header)
+        if not 0 <= index < len(layout.generations):
+            raise ValueError("Tile index out of range: %d" % index)
+
+        first_row = index * layout.rows
+        rows = min(layout.rows, header.height - first_row)
+        if image.mode != header.image_mode or image.size != (header.width, rows):
+            raise ValueError("Tile %d needs a %s image of %dx%d pixels" % (index, header.image_mode, header.width, rows))
+
+        # A new generation gives the tile a fresh IV
+        layout.generations[index] += 1
+        ciphertext = ofb_tile(key, header.iv, index, layout.generations[index], image.tobytes())
+
+        file.seek(CONTAINER_HEADER.size + first_row * row_size(header.image_mode, header.width))
+        file.write(ciphertext)
+        file.seek(CONTAINER_HEADER.size + header.payload_length)
+        file.write(pack_tile_table(layout))
+
+
+# Decrypts the part of a tiled payload between offset and end, tile by tile
+def decrypt_tiles_range(file, header, key, offset, end):
+    file.seek(CONTAINER_HEADER.size + header.payload_length)
+    layout = read_tile_table(file, header)
+    size = layout.rows * row_size(header.image_mode, header.width)
+
+    parts = []
+    for index in range(offset // size, (end + size - 1) // size):
+        tile_start = index * size
+        start, stop = max(offset, tile_start) - tile_start, min(end, tile_start + size) - tile_start
+
+        # The tile is an OFB stream of its own, its keystream is generated up to `stop`
+        state = tile_iv(key, header.iv, index, layout.generations[index])
+        keystream = next(ofb_keystream(key, state, 16 * ((stop + 15) // 16)))[start:stop]
+
+        file.seek(CONTAINER_HEADER.size + tile_start + start)
+        parts.append(xor_bytes(file.read(stop - start), keystream))
+    return b''.join(parts)
+
+
+# Decrypts `length` bytes of the payload of a container starting at `offset` without
+# decrypting what comes before: CTR jumps to the counter of the first block, OFB restarts
+# the keystream from the nearest checkpoint (from the IV when the file has no index) and
+# tiled OFB only decrypts the tiles the range covers
+def decrypt_range(path, key, offset, length):
+    key = to_bytes(key)
+    with open(path, 'rb') as file:
+        header = read_container_header(file)
+
+        end = min(offset + length, header.payload_length)
+        if offset < 0 or offset >= end:
+            return b''
+        if header.flags & CONTAINER_FLAG_TILES:
+            return decrypt_tiles_range(file, header, key, offset, end)
+        first_block = offset // 16
+        n_blocks = (end + 15) // 16 - first_block
+
+        if header.cipher_mode == "ctr":
+            keystream = ctr_keystream(key, header.iv, first_block, n_blocks)
+        else:
+            state, start_block = header.iv, 0
+            if header.flags & CONTAINER_FLAG_CHECKPOINTS:
+                state, start_block = read_checkpoint(file, header, key, first_block)
+            skip = first_block - start_block
+            keystream = next(ofb_keystream(key, state, 16 * (skip + n_blocks)))[16 * skip:]
+
+        file.seek(CONTAINER_HEADER.size + 16 * first_block)
+        ciphertext = file.read(end - 16 * first_block)
+
+    plaintext = xor_bytes(ciphertext, keystream[:len(ciphertext)])
+    return plaintext[offset - 16 * first_block:]
+
+
+# Decrypts only the pixel rows first_row .. first_row + row_count - 1 of an encrypted image
+def decrypt_rows(path, key, first_row, row_count):
+    with open(path, 'rb') as file:
+        header = read_container_header(file)
+    if header.flags & CONTAINER_FLAG_FILE:
+        raise ValueError("Container holds the original image file, not pixel rows")
+    if first_row < 0:
+        raise ValueError("Row index out of range: %d" % first_row)
+
+    from PIL import Image
+    row_count = max(0, min(row_count, header.height - first_row))
+    stride = row_size(header.image_mode, header.width)
+    pixels = decrypt_range(path, key, first_row * stride, row_count * stride)
+    return Image.frombytes(header.image_mode, (header.width, row_count), pixels)
+
+
+class HashingFile:
+    """
+    Wraps a binary file and feeds every byte read from or written to it into a
+    hashlib object, so the file is hashed in the same pass that produces or
+    consumes it.
+    """
+
+    def __init__(self, file, hasher):
+        self.file = file
+        self.hasher = hasher
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.hasher.update(data)
+        return data
+
+    def write(self, data):
+        self.hasher.update(data)
+        return self.file.write(data)
+
+
+# OFB and CTR decryption are the same operation as encryption
+def cipher_chunks(chunks, key, mode, iv, workers=None, pipelined=False, checkpoints=None):
+    if mode == "ctr":
+        # CTR shards the whole buffer over its process pool
+        return [ctr_encrypt_bytes(b''.join(chunks), key, iv, workers)]
+    if pipelined:
+        return ofb_pipeline(chunks, key, iv, checkpoints=checkpoints)
+    return ofb_encrypt_stream(chunks, key, iv, checkpoints=checkpoints)
+
+
+# Reads a container from `file` and decrypts its payload, returns the header and the decrypted
+# bytes (pixel rows, or the original file with CONTAINER_FLAG_FILE). Nothing is written.
+def decrypt_container(file, key, workers=None, pipelined=False):
+    header = read_container_header(file)
+    payload = read_payload(file, header.payload_length)
+    if header.flags & CONTAINER_FLAG_TILES:
+        # The tile table follows the payload, the tiles are split once it is read
+        payload = b''.join(payload)
+        layout = read_tile_table(file, header)
+        stride = row_size(header.image_mode, header.width)
+        return header, b''.join(ofb_decrypt_tiles(payload, key, header.iv, stride, layout, workers))
+    return header, b''.join(cipher_chunks(payload, key, header.cipher_mode, header.iv, workers, pipelined))
+
+
+# Decrypts a container held in memory through `cache` (an OutputCache): the decrypted bytes are
+# found by the container digest (computed when it isn't given), the key and the IV, and only
+# decrypted on a miss. Returns the header and the decrypted bytes like decrypt_container.
+def decrypt_cached(container, key, cache, workers=None, pipelined=False, digest=None):
+    if digest is None:
+        digest = hashlib.sha256(container).digest()
+    header = read_container_header(io.BytesIO(container))
+    cache_args = ("image", digest, to_bytes(key), header.iv)
+    decrypted = cache.get(*cache_args)
+    if decrypted is None:
+        header, decrypted = decrypt_container(io.BytesIO(container), key, workers, pipelined)
+        cache.put(*cache_args, decrypted)
+    return header, decrypted
+
+
+# The image of decrypted container bytes, also written to output_path when there is one
+@instrumented()
+def decrypted_image(header, decrypted, output_path=None):
+    from PIL import Image
+
+    if header.flags & CONTAINER_FLAG_FILE:
+        # The original file is written back as it was
+        if output_path:
+            with open(output_path, 'wb') as output:
+                output.write(decrypted)
+        # Opening only reads the header, the file is decoded when the pixels are used
+        return Image.open(io.BytesIO(decrypted))
+
+    # The image uses the decrypted buffer directly (PIL copies it only for the
+    # modes it can't map, like RGB)
+    img = Image.frombuffer(header.image_mode, (header.width, header.height), decrypted,
+                           'raw', header.image_mode, 0, 1)
+    if output_path:
+        img.save(output_path)
+    return img
+
+
+# Encrypts an image into a container file or decrypts a container back to an image
+# mode is "ofb" (default) or "ctr", workers is the CTR (or tiled OFB) process pool size
+# pipelined runs OFB through ofb_pipeline so reading, decoding and writing overlap the cipher
+# checkpoint_interval (OFB only) adds a checkpoint index every that many blocks for decrypt_range
+# hasher (a hashlib object) is updated with every byte of the container written or read,
+# so hasher.digest() equals the hash of the file without reading it again
+# tile_rows (OFB only) encrypts bands of that many pixel rows as separate streams in the
+# process pool, see update_tile to change one band afterwards
+# passthrough encrypts the bytes of the image file as they are (e.g. the compressed JPEG)
+# instead of its decoded pixels, decryption then restores the same file byte for byte
+# Decryption takes the cipher mode, the IV and the tile layout from the container and
+# returns the decrypted PIL Image, output_path is optional and only needed to keep a file
+# cache (an OutputCache) keeps decrypted outputs by container digest, key and IV, so the
+# same container received again isn't decrypted again
+def process_image(typ, key, iv, input_path, output_path, mode="ofb", workers=None, pipelined=False,
+                  checkpoint_interval=None, hasher=None, tile_rows=None, passthrough=False,
+                  cache=None):
+    from PIL import Image
+    key = to_bytes(key)
+    iv = to_bytes(iv)
+
+    mode = mode.lower()
+    if mode not in CIPHER_MODES:
+        raise ValueError("Unknown cipher mode: %s" % mode)
+    if pipelined and mode != "ofb":
+        raise ValueError("Only OFB mode can be pipelined")
+    if checkpoint_interval and mode != "ofb":
+        raise ValueError("Only OFB mode uses a checkpoint index")
+    if tile_rows and (mode != "ofb" or pipelined or checkpoint_interval):
+        raise ValueError("Tiles are only used in plain OFB mode")
+    if tile_rows and passthrough:
+        raise ValueError("Tiles are pixel rows, they can't be used with passthrough")
+
+    if typ.lower() == "encrypt":
+        checkpoints = Checkpoints(checkpoint_interval, []) if checkpoint_interval else None
+        flags = CONTAINER_FLAG_CHECKPOINTS if checkpoints else 0
+        if tile_rows:
+            flags |= CONTAINER_FLAG_TILES
+        if passthrough:
+            flags |= CONTAINER_FLAG_FILE
+
+        # Opening the image only reads its header, the pixels are decoded by image_chunks
+        with Image.open(input_path) as img:
+            width, height = img.size
+            stride = row_size(img.mode, width)
+            payload_length = os.path.getsize(input_path) if passthrough else height * stride
+            header = ContainerHeader(flags, img.mode, width, height, mode, iv, payload_length)
+
+        if passthrough:
+            chunks = cipher_chunks(file_chunks(input_path), key, mode, iv, workers, pipelined, checkpoints)
+        elif tile_rows:
+            layout = TileLayout(tile_rows, [0] * tile_count(height, tile_rows))
+            chunks = ofb_encrypt_tiles(image_to_bytes(input_path), key, iv, stride, layout, workers)
+        else:
+            chunks = cipher_chunks(image_chunks(input_path), key, mode, iv, workers, pipelined, checkpoints)
+
+        with open(output_path, 'wb') as file:
+            if hasher is not None:
+                file = HashingFile(file, hasher)
+            file.write(pack_container_header(header))
+            for chunk in chunks:
+                file.write(chunk)
+            if checkpoints:
+                file.write(pack_checkpoint_index(key, checkpoints, header.payload_length))
+            if tile_rows:
+                file.write(pack_tile_table(layout))
+        print("Image encrypted successfully.")
+
+    elif typ.lower() == "decrypt":
+        if cache is not None:
+            # The container is read once: it is hashed for the cache key and, on a miss,
+            # decrypted from memory
+            with open(input_path, 'rb') as file:
+                container = file.read()
+            if hasher is not None:
+                hasher.update(container)
+            header, decrypted = decrypt_cached(container, key, cache, workers, pipelined)
+        else:
+            with open(input_path, 'rb') as file:
+                if hasher is not None:
+                    file = HashingFile(file, hasher)
+                header, decrypted = decrypt_container(file, key, workers, pipelined)
+                if hasher is not None:
+                    # The hash covers the whole file, including a checkpoint index after the payload
+                    for _ in read_chunks(file):
+                        pass
+
+        img = decrypted_image(header, decrypted, output_path)
+        print("Image decrypted successfully.")
+        return img
@@ -1,5 +1,8 @@
-from PIL import Image
+import os
 
 # Create a small image with a solid color (e.g., red)
-img = Image.new('RGB', (100, 100), "gray")
-img.save("Assets/test_image.jpeg")
\ No newline at end of file
+if __name__ == '__main__':
+    from PIL import Image
+
+    img = Image.new('RGB', (100, 100), "gray")
+    img.save(os.path.join("Assets", "test_image.jpeg"))
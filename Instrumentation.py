@@ -0,0 +1,182 @@
+import bisect
+import functools
+import os
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+# Opt-in timing of the main stages (key setup, block cipher calls, keystreams, image
+# conversion, Merkle-Hellman and ECDSA). Functions are marked with @instrumented; while
+# instrumentation is disabled a marked function costs one extra call and a flag test.
+# Every process keeps its own numbers, the workers of the process pools aren't included.
+# Setting CRYPTO_INSTRUMENTATION=1 enables it from the start (also in spawned workers).
+enabled = os.environ.get("CRYPTO_INSTRUMENTATION") == "1"
+
+# Upper bounds in seconds of the latency histogram buckets, the last bucket is +Inf
+LATENCY_BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, 10.0)
+
+METRIC_PREFIX = "cryptochiper"
+
+# inspect.CO_GENERATOR, inspect itself takes longer to import than the cipher modules
+CO_GENERATOR = 0x20
+
+
+class StageStats:
+    """Call count, error count and latency histogram of one stage."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, seconds, error):
+        self.count += 1
+        self.errors += error
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+
+_stages = {}
+_lock = threading.Lock()
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+
+
+def record(stage, seconds, error=False):
+    with _lock:
+        stats = _stages.get(stage)
+        if stats is None:
+            stats = _stages[stage] = StageStats()
+        stats.add(seconds, error)
+
+
+def _timed_generator(stage, generator):
+    # Every item is one observation: the time spent producing it, not the time the consumer holds it
+    try:
+        while True:
+            start = perf_counter()
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            except Exception:
+                record(stage, perf_counter() - start, True)
+                raise
+            record(stage, perf_counter() - start)
+            yield item
+    finally:
+        generator.close()
+
+
+def instrumented(stage=None):
+    """
+    Decorator that times every call of a function as `stage` (by default the
+    function name). A generator function is timed per item it yields.
+    """
+
+    def decorate(function):
+        name = stage or function.__name__
+
+        if function.__code__.co_flags & CO_GENERATOR:
+            @functools.wraps(function)
+            def generator_wrapper(*args, **kwargs):
+                if not enabled:
+                    return function(*args, **kwargs)
+                return _timed_generator(name, function(*args, **kwargs))
+
+            return generator_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            start = perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except Exception:
+                record(name, perf_counter() - start, True)
+                raise
+            record(name, perf_counter() - start)
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+def snapshot():
+    """The numbers of every stage so far, as a dict that can be dumped to JSON."""
+    with _lock:
+        return {stage: {"count": stats.count, "errors": stats.errors, "seconds_total": stats.total,
+                        "seconds_max": stats.max,
+                        "buckets": dict(zip([str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"], stats.buckets))}
+                for stage, stats in sorted(_stages.items())}
+
+
+def to_json():
+    import json
+    return json.dumps(snapshot(), indent=2)
+
+
+def to_prometheus(prefix=METRIC_PREFIX):
+    """The numbers of every stage in the Prometheus text exposition format."""
+    stages = snapshot()
+    lines = ["# HELP %s_stage_seconds Time spent in each stage" % prefix,
+             "# TYPE %s_stage_seconds histogram" % prefix]
+    for stage, stats in stages.items():
+        cumulative = 0
+        for bound, count in stats["buckets"].items():
+            cumulative += count
+            lines.append('%s_stage_seconds_bucket{stage="%s",le="%s"} %d' % (prefix, stage, bound, cumulative))
+        lines.append('%s_stage_seconds_sum{stage="%s"} %r' % (prefix, stage, stats["seconds_total"]))
+        lines.append('%s_stage_seconds_count{stage="%s"} %d' % (prefix, stage, stats["count"]))
+    lines += ["# HELP %s_stage_errors_total Calls of each stage that raised" % prefix,
+              "# TYPE %s_stage_errors_total counter" % prefix]
+    for stage, stats in stages.items():
+        lines.append('%s_stage_errors_total{stage="%s"} %d' % (prefix, stage, stats["errors"]))
+    return '\n'.join(lines) + '\n'
+
+
+# Writes the numbers to path, in the Prometheus text format for a .prom or .txt file and as JSON otherwise
+def write_metrics(path):
+    text = to_prometheus() if path.endswith(('.prom', '.txt')) else to_json()
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(text)
+
+
+@contextmanager
+def profiled(path=None, sort="cumulative", limit=30):
+    """
+    Runs the body of the with statement under cProfile. The statistics are
+    dumped to path (for pstats or snakeviz) or, without a path, the top
+    `limit` functions by `sort` are printed.
+    """
+    import cProfile
+    import pstats
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        if path is not None:
+            profile.dump_stats(path)
+        else:
+            pstats.Stats(profile).sort_stats(sort).print_stats(limit)
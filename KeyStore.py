@@ -0,0 +1,210 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+
+import Twofish
+from Hellman import MerkleHellman
+from Twofish import TwofishContext, to_bytes
+from ecdsa.ecdsa_api import get_dsa, point_pairs, precompute_public_key, public_key_point, use_base_table
+
+
+# Key material store
+# A file of precomputed key material so a new process doesn't redo the setup:
+#   magic (4s) version (B) entry count (I)
+#   per entry: kind (B) name (32s) offset (Q) length (Q) SHA-256 of the data (32s)
+#   SHA-256 of everything above, then the entry data
+# Entry names are SHA-256 hashes (of the Twofish key, or of a label). A name doesn't reveal
+# its key, but the entries do: an expanded Twofish key starts with the key itself and a
+# Merkle-Hellman entry holds the private parameters. The file is created readable by its
+# owner only and must be protected like the keys themselves.
+KEY_STORE_MAGIC = b'TFKS'
+KEY_STORE_VERSION = 1
+KEY_STORE_HEADER = struct.Struct('<4sBI')
+KEY_STORE_ENTRY = struct.Struct('<B32sQQ32s')
+
+KEY_TWOFISH = 1
+KEY_MERKLE_HELLMAN = 2
+KEY_ECDSA_PUBLIC = 3
+KEY_ECDSA_BASE = 4
+
+# Layout of an expanded Twofish key: key, round keys, S0 and S1, g tables
+TWOFISH_CONTEXT = struct.Struct('<16s40I8B1024I')
+
+
+def key_store_name(kind, identity):
+    if isinstance(identity, str):
+        identity = identity.encode()
+    return hashlib.sha256(bytes([kind]) + identity).digest()
+
+
+# Variable size integers: count (I), then length (I) and big endian bytes of each one
+def pack_ints(values):
+    parts = [struct.pack('<I', len(values))]
+    for value in values:
+        raw = int(value).to_bytes((int(value).bit_length() + 7) // 8, 'big')
+        parts.append(struct.pack('<I', len(raw)) + raw)
+    return b''.join(parts)
+
+
+def unpack_ints(data):
+    count, = struct.unpack_from('<I', data)
+    values, offset = [], 4
+    for _ in range(count):
+        length, = struct.unpack_from('<I', data, offset)
+        values.append(int.from_bytes(data[offset + 4:offset + 4 + length], 'big'))
+        offset += 4 + length
+    return values
+
+
+def pack_twofish_context(ctx):
+    return TWOFISH_CONTEXT.pack(ctx.key, *ctx.round_keys, *ctx.S0, *ctx.S1, *(x for T in ctx.g_tables for x in T))
+
+
+def unpack_twofish_context(data):
+    values = TWOFISH_CONTEXT.unpack(data)
+    g = values[49:]
+    return TwofishContext.from_parts(values[0], values[1:41], values[41:45], values[45:49],
+                                     (g[0:256], g[256:512], g[512:768], g[768:1024]))
+
+
+def pack_merkle_hellman(mh):
+    if mh.r_inverse is None:
+        from gmpy2 import invert
+        r_inverse = invert(mh.r, mh.q)
+    else:
+        r_inverse = mh.r_inverse
+    return pack_ints([mh.q, mh.r, r_inverse, len(mh.w)] + list(mh.w) + list(mh.b))
+
+
+def unpack_merkle_hellman(data):
+    values = unpack_ints(data)
+    q, r, r_inverse, n = values[:4]
+    return MerkleHellman(values[4 + n:], values[4:4 + n], q, r, r_inverse)
+
+
+def pack_points(pairs):
+    return pack_ints([value for pair in pairs for value in pair])
+
+
+def unpack_points(data):
+    values = unpack_ints(data)
+    return list(zip(values[0::2], values[1::2]))
+
+
+# Writes a key store: twofish_keys are expanded, merkle_hellman and public_keys map a label to a
+# MerkleHellman (with its private parameters) or to an ECDSA public key (kept with its doublings
+# table). The table of the secp256k1 generator is always included.
+def save_key_store(path, twofish_keys=(), merkle_hellman=None, public_keys=None):
+    entries = []
+    for key in twofish_keys:
+        key = to_bytes(key.zfill(32) if isinstance(key, str) else key)
+        entries.append((KEY_TWOFISH, key_store_name(KEY_TWOFISH, key), pack_twofish_context(TwofishContext(key))))
+    for label, mh in (merkle_hellman or {}).items():
+        entries.append((KEY_MERKLE_HELLMAN, key_store_name(KEY_MERKLE_HELLMAN, label), pack_merkle_hellman(mh)))
+    for label, public_key in (public_keys or {}).items():
+        table = point_pairs(precompute_public_key(public_key))
+        entries.append((KEY_ECDSA_PUBLIC, key_store_name(KEY_ECDSA_PUBLIC, label), pack_points(table)))
+    entries.append((KEY_ECDSA_BASE, key_store_name(KEY_ECDSA_BASE, "secp256k1"),
+                    pack_points(point_pairs(get_dsa().G_table))))
+
+    directory = [KEY_STORE_HEADER.pack(KEY_STORE_MAGIC, KEY_STORE_VERSION, len(entries))]
+    offset = KEY_STORE_HEADER.size + KEY_STORE_ENTRY.size * len(entries) + 32
+    for kind, name, data in entries:
+        directory.append(KEY_STORE_ENTRY.pack(kind, name, offset, len(data), hashlib.sha256(data).digest()))
+        offset += len(data)
+    directory = b''.join(directory)
+
+    # Written under a temporary name so a reader never maps a partial store. A leftover
+    # temporary file is removed first, it would keep its own permissions
+    try:
+        os.remove(path + '.tmp')
+    except FileNotFoundError:
+        pass
+    fd = os.open(path + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o600)
+    with os.fdopen(fd, 'wb') as file:
+        file.write(directory)
+        file.write(hashlib.sha256(directory).digest())
+        for _, _, data in entries:
+            file.write(data)
+    os.replace(path + '.tmp', path)
+
+
+class KeyStore:
+    """
+    A key store file opened for reading. The file is memory mapped and only its
+    directory is read and checked when it is opened; an entry is checked against
+    its SHA-256 and decoded the first time it is asked for. Integrity errors
+    raise ValueError.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.decoded = {}
+        self.lock = threading.Lock()
+
+        if len(self.data) < KEY_STORE_HEADER.size:
+            raise ValueError("Truncated key store")
+        magic, version, count = KEY_STORE_HEADER.unpack_from(self.data)
+        if magic != KEY_STORE_MAGIC:
+            raise ValueError("Not a key store")
+        if version != KEY_STORE_VERSION:
+            raise ValueError("Unsupported key store version: %d" % version)
+
+        end = KEY_STORE_HEADER.size + KEY_STORE_ENTRY.size * count
+        if len(self.data) < end + 32 or hashlib.sha256(self.data[:end]).digest() != self.data[end:end + 32]:
+            raise ValueError("Key store directory is corrupted")
+
+        self.entries = {}
+        for i in range(count):
+            kind, name, offset, length, digest = KEY_STORE_ENTRY.unpack_from(
+                self.data, KEY_STORE_HEADER.size + KEY_STORE_ENTRY.size * i)
+            self.entries[(kind, name)] = (offset, length, digest)
+
+    def _entry(self, kind, identity, decode):
+        name = (kind, key_store_name(kind, identity))
+        if name not in self.entries:
+            return None
+        with self.lock:
+            if name not in self.decoded:
+                offset, length, digest = self.entries[name]
+                data = self.data[offset:offset + length]
+                if len(data) != length or hashlib.sha256(data).digest() != digest:
+                    raise ValueError("Key store entry is corrupted")
+                self.decoded[name] = decode(data)
+            return self.decoded[name]
+
+    def twofish_context(self, key):
+        return self._entry(KEY_TWOFISH, to_bytes(key), unpack_twofish_context)
+
+    def merkle_hellman(self, label):
+        return self._entry(KEY_MERKLE_HELLMAN, label, unpack_merkle_hellman)
+
+    def public_key(self, label):
+        # The public key, its doublings table is handed to precompute_public_key
+        table = self._entry(KEY_ECDSA_PUBLIC, label, unpack_points)
+        if table is None:
+            return None
+        precompute_public_key(public_key_point(*table[0]), table)
+        return public_key_point(*table[0])
+
+    def base_table(self):
+        return self._entry(KEY_ECDSA_BASE, "secp256k1", unpack_points)
+
+    def close(self):
+        self.data.close()
+
+
+# Opens a key store and uses it from now on: expanded Twofish keys are taken from it by
+# get_context and the secp256k1 generator table is installed. Returns the KeyStore.
+def use_key_store(path):
+    store = KeyStore(path)
+    Twofish.key_store = store
+    Twofish._cached_context.cache_clear()
+
+    base_table = store.base_table()
+    if base_table is not None:
+        use_base_table(base_table)
+    return store
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# Default bounds of the in-memory tier
+CACHE_MAX_ENTRIES = 64
+CACHE_MAX_BYTES = 256 << 20
+
+# Default bound of the on-disk tier
+CACHE_DISK_MAX_BYTES = 1 << 30
+
+# Kinds of entries never written to (or read from) the disk tier. A verification result is a
+# single unauthenticated byte, whoever can write the directory could turn "forged" into "verified"
+MEMORY_ONLY_KINDS = ("verify",)
+
+
+class OutputCache:
+    """
+    Content-addressed cache of decrypted outputs and verification results.
+
+    An entry is found by (kind, ciphertext digest, key fingerprint, IV), the key
+    itself is never stored, only a SHA-256 of it. Values are bytes. The memory
+    tier is an LRU bounded by entry count and total size; with a disk_dir the
+    entries evicted from memory stay on disk, and the least recently used
+    files are removed once the directory grows past disk_max_bytes. The
+    directory is scanned once when the cache is created, its size is tracked
+    in memory afterwards. Verification results (MEMORY_ONLY_KINDS) stay in
+    memory. The disk tier holds plaintext, only point it at trusted storage.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES, disk_dir=None,
+                 disk_max_bytes=CACHE_DISK_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        # Files of the disk tier in least recently used order, name -> size
+        self.disk_files = OrderedDict()
+        self.disk_size = 0
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_scan()
+
+    @staticmethod
+    def fingerprint(key):
+        if isinstance(key, str):
+            key = key.encode()
+        return hashlib.sha256(b'key fingerprint\0' + key).digest()
+
+    # The name of an entry, also the name of its file in the disk tier
+    def entry_name(self, kind, digest, key, iv):
+        if isinstance(iv, str):
+            iv = iv.encode()
+        name = hashlib.sha256()
+        for part in (kind.encode(), digest, self.fingerprint(key), iv):
+            name.update(len(part).to_bytes(4, 'little'))
+            name.update(part)
+        return name.hexdigest()
+
+    def get(self, kind, digest, key, iv=b''):
+        name = self.entry_name(kind, digest, key, iv)
+        with self.lock:
+            if name in self.entries:
+                self.entries.move_to_end(name)
+                self.hits += 1
+                return self.entries[name]
+
+            value = None if kind in MEMORY_ONLY_KINDS else self._disk_get(name)
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._memory_put(name, value)
+            return value
+
+    def put(self, kind, digest, key, iv, value):
+        name = self.entry_name(kind, digest, key, iv)
+        value = bytes(value)
+        with self.lock:
+            self._memory_put(name, value)
+            if kind not in MEMORY_ONLY_KINDS:
+                self._disk_put(name, value)
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                    "entries": len(self.entries), "bytes": self.size}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _memory_put(self, name, value):
+        if name in self.entries:
+            self.size -= len(self.entries.pop(name))
+        if len(value) > self.max_bytes:
+            return
+        self.entries[name] = value
+        self.size += len(value)
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def _disk_path(self, name):
+        return os.path.join(self.disk_dir, name)
+
+    def _disk_scan(self):
+        files = []
+        with os.scandir(self.disk_dir) as scan:
+            for entry in scan:
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name, stat.st_size))
+        # The modification times of an earlier run order the files, oldest first
+        for _, name, size in sorted(files):
+            self.disk_files[name] = size
+            self.disk_size += size
+        self._disk_evict()
+
+    def _disk_get(self, name):
+        if self.disk_dir is None:
+            return None
+        try:
+            with open(self._disk_path(name), 'rb') as file:
+                value = file.read()
+        except FileNotFoundError:
+            self.disk_size -= self.disk_files.pop(name, 0)
+            return None
+        # The modification time keeps the order for the next run. A file another process
+        # wrote since the scan starts being tracked here
+        os.utime(self._disk_path(name))
+        self.disk_size += len(value) - self.disk_files.pop(name, 0)
+        self.disk_files[name] = len(value)
+        return value
+
+    def _disk_put(self, name, value):
+        if self.disk_dir is None or len(value) > self.disk_max_bytes:
+            return
+        # Written under a temporary name so a reader never sees a partial file
+        temp_path = self._disk_path(name + '.tmp')
+        with open(temp_path, 'wb') as file:
+            file.write(value)
+        os.replace(temp_path, self._disk_path(name))
+
+        self.disk_size += len(value) - self.disk_files.pop(name, 0)
+        self.disk_files[name] = len(value)
+        self._disk_evict()
+
+    def _disk_evict(self):
+        # Oldest first
+        while self.disk_size > self.disk_max_bytes:
+            name, size = self.disk_files.popitem(last=False)
+            self.disk_size -= size
+            try:
+                os.remove(self._disk_path(name))
+            except FileNotFoundError:
+                pass
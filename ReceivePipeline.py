@@ -0,0 +1,96 @@
+import hashlib
+import io
+
+from ImageContainer import decrypt_cached, decrypt_container, decrypted_image
+from ecdsa.ecdsa_api import public_key_point, verify_cache_args, verify_digest
+
+
+# Bob's side of the exchange as a small task graph. The container is read and hashed once in
+# this process, then two independent branches run on those bytes:
+#   verify:   ECDSA verification of the digest                     (in a worker process)
+#   decrypt:  Merkle-Hellman key unwrap -> Twofish decryption      (in this process)
+# Both branches run at the same time, so with two cores a receive takes about as long as the
+# slower branch instead of the sum. The bytes that are decrypted are the bytes whose digest is
+# verified, the file isn't read again. Decryption is speculative: its output stays in a private
+# buffer and is only turned into an image (and written) once the signature is verified.
+# With a cache a container received again skips the branches whose results are cached.
+
+
+class VerificationError(Exception):
+    pass
+
+
+# Runs in a worker process, the public key and the signature are sent as plain integers
+def verify_digest_job(digest, public_key, signature):
+    return bool(verify_digest(digest, public_key_point(*public_key), signature))
+
+
+def receive_image(input_path, wrapped_key, mh, private_key, public_key, signature, output_path=None,
+                  executor=None, workers=None, cache=None):
+    """
+    Verifies, unwraps the key of and decrypts a received container concurrently.
+
+    wrapped_key is the Twofish key encrypted with mh (a MerkleHellman) and
+    private_key its (w, q, r). The signature (r, s) of the container file is
+    checked against public_key in `executor` (a concurrent.futures executor,
+    by default a process pool of one worker for this call; pass a long-lived
+    one when receiving more than once) while this process decrypts with CTR
+    or tiles using `workers`. With a cache (an OutputCache) the verification
+    result and the decrypted bytes of a container received before are reused.
+    Returns the decrypted PIL Image, also written to output_path when there
+    is one. If the signature doesn't verify, the decrypted bytes are dropped
+    unused and VerificationError is raised; errors of the decryption itself
+    are only raised for containers whose signature verifies.
+    """
+    from concurrent.futures import ProcessPoolExecutor  # only loaded when a pool is used
+
+    with open(input_path, 'rb') as file:
+        container = file.read()
+    digest = hashlib.sha256(container).digest()
+
+    verified = None
+    if cache is not None:
+        verify_args = verify_cache_args(digest, public_key, signature)
+        cached = cache.get(*verify_args)
+        if cached is not None:
+            verified = cached == b'\1'
+    if verified is False:
+        # Known to be forged, nothing is unwrapped or decrypted
+        raise VerificationError("The signature of %s doesn't verify" % input_path)
+
+    public_key = (int(public_key.x), int(public_key.y))
+    signature = tuple(int(part) for part in signature)
+
+    pool = None
+    try:
+        if verified is None:
+            pool = executor if executor is not None else ProcessPoolExecutor(max_workers=1)
+            verification = pool.submit(verify_digest_job, digest, public_key, signature)
+
+        def check_signature():
+            if verified is None:
+                signature_ok = verification.result()
+                if cache is not None:
+                    cache.put(*verify_args, b'\1' if signature_ok else b'\0')
+                if not signature_ok:
+                    raise VerificationError("The signature of %s doesn't verify, the decrypted output was "
+                                            "discarded" % input_path)
+
+        try:
+            key = mh.decryptKey(wrapped_key, *private_key).zfill(32)
+            if cache is None:
+                header, decrypted = decrypt_container(io.BytesIO(container), key, workers)
+            else:
+                header, decrypted = decrypt_cached(container, key, cache, workers, digest=digest)
+        except Exception:
+            # A forged container is reported as such, not by what went wrong decrypting it
+            check_signature()
+            raise
+        check_signature()
+    finally:
+        if executor is None and pool is not None:
+            pool.shutdown()
+
+    img = decrypted_image(header, decrypted, output_path)
+    print("Image decrypted successfully.")
+    return img
@@ -0,0 +1,509 @@
+import functools
+import secrets
+import string
+import struct
+
+from Instrumentation import instrumented
+
+
+def generate_secure_key(length=32):
+    # Generate a secure random string of `length` characters
+    alphabet = string.ascii_letters + string.digits
+    return ''.join(secrets.choice(alphabet) for _ in range(length))
+
+
+# Keys and IVs are accepted as bytes or as hex strings zero padded to 128 bits
+def to_bytes(value):
+    if isinstance(value, str):
+        return bytes.fromhex(value.zfill(32))
+    return bytes(value)
+
+
+# all required matrix
+RS_matrix = [[0x01, 0xA4, 0x55, 0x87, 0x5A, 0x58, 0xDB, 0x9E], [0xA4, 0x56, 0x82, 0xF3, 0x1E, 0xC6, 0x68, 0xE5],
+             [0x02, 0xA1, 0xFC, 0xC1, 0x47, 0xAE, 0x3D, 0x19], [0xA4, 0x55, 0x87, 0x5A, 0x58, 0xDB, 0x9E, 0x03]]
+tq0 = [[0x8, 0x1, 0x7, 0xD, 0x6, 0xF, 0x3, 0x2, 0x0, 0xB, 0x5, 0x9, 0xE, 0xC, 0xA, 0x4],
+       [0xE, 0xC, 0xB, 0x8, 0x1, 0x2, 0x3, 0x5, 0xF, 0x4, 0xA, 0x6, 0x7, 0x0, 0x9, 0xD],
+       [0xB, 0xA, 0x5, 0xE, 0x6, 0xD, 0x9, 0x0, 0xC, 0x8, 0xF, 0x3, 0x2, 0x4, 0x7, 0x1],
+       [0xD, 0x7, 0xF, 0x4, 0x1, 0x2, 0x6, 0xE, 0x9, 0xB, 0x3, 0x0, 0x8, 0x5, 0xC, 0xA]]
+tq1 = [[0x2, 0x8, 0xB, 0xD, 0xF, 0x7, 0x6, 0xE, 0x3, 0x1, 0x9, 0x4, 0x0, 0xA, 0xC, 0x5],
+       [0x1, 0xE, 0x2, 0xB, 0x4, 0xC, 0x3, 0x7, 0x6, 0xD, 0xA, 0x5, 0xF, 0x9, 0x0, 0x8],
+       [0x4, 0xC, 0x7, 0x5, 0x1, 0x6, 0x9, 0xA, 0x0, 0xE, 0xD, 0x8, 0x2, 0xB, 0x3, 0xF],
+       [0xB, 0x9, 0x5, 0x1, 0xC, 0x3, 0xD, 0xE, 0x6, 0x4, 0x7, 0xF, 0x2, 0x0, 0x8, 0xA]]
+
+MDS = [[0x01, 0xEF, 0x5B, 0x5B], [0x5B, 0xEF, 0xEF, 0x01], [0xEF, 0x5B, 0x01, 0xEF], [0xEF, 0x01, 0xEF, 0x5B]]
+
+# Polynomials used for multiplication in RF and MDS matrix
+gf_mod = 2 ** 8 + 2 ** 6 + 2 ** 5 + 2 ** 3 + 1
+rs_mod = 2 ** 8 + 2 ** 6 + 2 ** 3 + 2 ** 2 + 1
+
+t = [tq0, tq1]
+
+# Number of expanded keys kept by get_context
+KEY_CACHE_SIZE = 64
+
+
+# Function to multiply in Galois Field with correct polynomial
+# Here modulus is used as the value of 2^n in the polynomial
+def gf2n_multiply(a, b, modulus):
+    overflow = 0x100
+    sum1 = 0
+    while (b > 0):
+        if (b & 1):
+            sum1 = sum1 ^ a
+        b = b >> 1
+        a = a << 1
+        if (a & overflow):
+            a = a ^ modulus
+    return sum1
+
+
+# Right rotation of number with rotation and bits as the parameter
+
+def ROR(num, rot, bits):
+    rot %= bits
+    return ((num >> rot) | (num << (bits - rot))) & ((1 << bits) - 1)
+
+
+# Left rotation of number with rotation and bits as the parameter
+
+def ROL(num, rot, bits):
+    rot %= bits
+    return ((num << rot) | (num >> (bits - rot))) & ((1 << bits) - 1)
+
+
+# Permuatation q on one byte with the 4 nibble tables tq (tq0 for q0, tq1 for q1)
+def q_permutation(inp, tq):
+    t0, t1, t2, t3 = tq
+
+    a0 = inp >> 4
+    b0 = inp & 0xF
+    a1 = a0 ^ b0
+    b1 = a0 ^ (ROR(b0, 1, 4)) ^ ((8 * a0) % 16)
+    a2 = t0[a1]
+    b2 = t1[b1]
+    a3 = a2 ^ b2
+    b3 = a2 ^ (ROR(b2, 1, 4)) ^ ((8 * a2) % 16)
+    a4 = t2[a3]
+    b4 = t3[b3]
+    y = 16 * b4 + a4
+    return y
+
+
+# q0 and q1 are fixed permutations so they are computed once for all 256 inputs
+Q0 = tuple(q_permutation(x, tq0) for x in range(256))
+Q1 = tuple(q_permutation(x, tq1) for x in range(256))
+
+
+# Permuatation function q1 used in the SBOX
+def q1(inp):
+    return Q1[inp]
+
+
+# Permuatation function q0 used in the SBOX
+
+def q0(inp):
+    return Q0[inp]
+
+
+# Multiply-by-constant table of a constant of the MDS or RS matrix
+# gf_mul_table(c, modulus)[x] == gf2n_multiply(c, x, modulus)
+# The tables are built the first time a key is expanded, not when the module is imported
+@functools.lru_cache(maxsize=None)
+def gf_mul_table(c, modulus):
+    return tuple(gf2n_multiply(c, x, modulus) for x in range(256))
+
+
+# mds_columns()[j][y] is column j of MDS multiplied by the byte y, packed as a little endian
+# 32-bit word (row i in byte i), so MDS * [y0, y1, y2, y3] is the XOR of 4 lookups
+@functools.lru_cache(maxsize=None)
+def mds_columns():
+    return tuple(
+        tuple(gf_mul_table(MDS[0][j], gf_mod)[y] | (gf_mul_table(MDS[1][j], gf_mod)[y] << 8) |
+              (gf_mul_table(MDS[2][j], gf_mod)[y] << 16) | (gf_mul_table(MDS[3][j], gf_mod)[y] << 24)
+              for y in range(256))
+        for j in range(4))
+
+
+# pseudo-Hadamard transform (PHT) function
+# a=(a+b)% 2^32
+# b=(a+2b)% 2^32
+
+def PHT(a, b):
+    num1 = (a + b) % (pow(2, 32))
+    num2 = (a + 2 * b) % pow(2, 32)
+    return num1, num2
+
+
+# g function used inside the F function
+# The key dependent SBOXES and the MDS multiplication are already folded into the
+# context tables (see full_keying), one table per byte of the input word
+
+def g_function(ctx, inp_r):
+    T0, T1, T2, T3 = ctx.g_tables
+    return T0[inp_r & 0xFF] ^ T1[(inp_r >> 8) & 0xFF] ^ T2[(inp_r >> 16) & 0xFF] ^ T3[inp_r >> 24]
+
+
+# A helper function for the main function H used in round key generation
+# It returns MDS * [y0, y1, y2, y3] already combined to a 32-bit little endian word
+
+def helper_h(inp1, M1, M2):
+    C0, C1, C2, C3 = mds_columns()
+
+    return (C0[Q1[Q0[Q0[inp1] ^ M1[0]] ^ M2[0]]] ^
+            C1[Q0[Q0[Q1[inp1] ^ M1[1]] ^ M2[1]]] ^
+            C2[Q1[Q1[Q0[inp1] ^ M1[2]] ^ M2[2]]] ^
+            C3[Q0[Q1[Q1[inp1] ^ M1[3]] ^ M2[3]]])
+
+
+# H function used in key scheduling
+def h_function(M_even, M_odd):
+    M0 = M_even[0]
+    M2 = M_even[1]
+    M1 = M_odd[0]
+    M3 = M_odd[1]
+
+    K_keys = []
+
+    # Loop for making 40 keys
+    for i in range(0, 40, 2):
+        inp1 = i
+        inp2 = i + 1
+
+        # Calling helper function which is performing the S-Box operations
+
+        key1 = helper_h(inp1, M2, M0)
+        key2 = helper_h(inp2, M3, M1)
+
+        # Rotating the key by 8 bits
+        key2 = ROL(key2, 8, 32)
+
+        # pseudo-Hadamard transform of the key1 and key2
+        key1, key2 = PHT(key1, key2)
+
+        # Left rotation by 9 bits of key2
+        key2 = ROL(key2, 9, 32)
+
+        # Finally appending the keys to main key list
+        K_keys.append(key1)
+        K_keys.append(key2)
+
+    return K_keys
+
+
+# A function for matrix multiplication which uses the Field multiplication and addition rules
+
+def mat_mul(mat1, mat2, modulus):
+    row1 = len(mat1)
+    col1 = len(mat1[0])
+
+    fin = []
+    for i in range(row1):
+        val = 0
+        for j in range(col1):
+            tmp1 = gf_mul_table(mat1[i][j], modulus)[mat2[j]]
+            val = val ^ tmp1
+        fin.append(val)
+    return fin
+
+
+# Main function for Key scheduling
+# Returns the 40 round keys and the S-box key words S0 and S1
+@instrumented()
+def key_schedule(key):
+    # array of 16 8 bit-keys provided by user
+    m_array = list(to_bytes(key))
+
+    # Making the Sbox S0 and S1 with RS modulo multiplication
+
+    S_0 = mat_mul(RS_matrix, m_array[:8], rs_mod)
+    S_1 = mat_mul(RS_matrix, m_array[8:16], rs_mod)
+
+    # Odd even matrix for round keys generation
+    M_even = []
+    M_odd = []
+
+    val = 0
+
+    # Making the even and odd lists
+    for i in range(0, len(m_array), 4):
+        tmp = m_array[i:i + 4]
+        if (val % 2 == 0):
+            M_even.append(tmp)
+        else:
+            M_odd.append(tmp)
+        val += 1
+    # Calling H function with parameter Meven and Modd
+
+    K_keys = h_function(M_even, M_odd)
+
+    # for i in range(0,40,2):
+    #     print(hex(K_keys[i])[2:].zfill(8),hex(K_keys[i+1])[2:].zfill(8))
+
+    return K_keys, S_0, S_1
+
+
+# The F function used in Encryption
+
+def f_function(ctx, r_array, k1, k2):
+    r0 = r_array[0]
+    r1 = r_array[1]
+
+    # Rotationg left
+    r1 = ROL(r1, 8, 32)
+    # Calling G function for  r0 and r1 and then obtaining t0 and t1
+    t0 = g_function(ctx, r0)
+    t1 = g_function(ctx, r1)
+
+    # pseudo-Hadamard transform of t0 and t1
+    t0, t1 = PHT(t0, t1)
+
+    # addition of round keys with modulo 2^32
+    f0 = (t0 + k1) & 0xFFFFFFFF
+    f1 = (t1 + k2) & 0xFFFFFFFF
+
+    # returning f0 and f1
+    return f0, f1
+
+
+# Full keying of the g function
+# g(X) = MDS * [s0(x0), s1(x1), s2(x2), s3(x3)] and every S-box output only meets one
+# column of MDS, so column j times s_j is folded into a table T_j of 256 32-bit words:
+# g(X) = T0[x0] ^ T1[x1] ^ T2[x2] ^ T3[x3]
+
+@instrumented()
+def full_keying(S_0, S_1):
+    C0, C1, C2, C3 = mds_columns()
+
+    return (tuple(C0[Q1[Q0[Q0[x] ^ S_0[0]] ^ S_1[0]]] for x in range(256)),
+            tuple(C1[Q0[Q0[Q1[x] ^ S_0[1]] ^ S_1[1]]] for x in range(256)),
+            tuple(C2[Q1[Q1[Q0[x] ^ S_0[2]] ^ S_1[2]]] for x in range(256)),
+            tuple(C3[Q0[Q1[Q1[x] ^ S_0[3]] ^ S_1[3]]] for x in range(256)))
+
+
+class TwofishContext:
+    """
+    An expanded Twofish key: the round keys, the S-box key words and the full
+    keying g tables. It is never changed after construction, so one context
+    can be shared between threads.
+    """
+
+    def __init__(self, key):
+        self.key = to_bytes(key)
+        round_keys, S_0, S_1 = key_schedule(self.key)
+        self.round_keys = tuple(round_keys)
+        self.S0 = tuple(S_0)
+        self.S1 = tuple(S_1)
+        self.g_tables = full_keying(self.S0, self.S1)
+
+    @classmethod
+    def from_parts(cls, key, round_keys, S0, S1, g_tables):
+        # A context expanded earlier (e.g. read from a KeyStore), the key schedule isn't run
+        ctx = cls.__new__(cls)
+        ctx.key = bytes(key)
+        ctx.round_keys = tuple(round_keys)
+        ctx.S0 = tuple(S0)
+        ctx.S1 = tuple(S1)
+        ctx.g_tables = tuple(tuple(table) for table in g_tables)
+        return ctx
+
+
+# KeyStore looked up before a key is expanded, see use_key_store
+key_store = None
+
+
+@functools.lru_cache(maxsize=KEY_CACHE_SIZE)
+def _cached_context(key):
+    if key_store is not None:
+        ctx = key_store.twofish_context(key)
+        if ctx is not None:
+            return ctx
+    return TwofishContext(key)
+
+
+# Expanded key for `key`, repeated keys are served from a bounded LRU cache
+def get_context(key):
+    return _cached_context(to_bytes(key))
+
+
+# Encrypt one block given as 4 little endian 32-bit words
+# This is encrypt_block with f_function and g_function inlined, two rounds per iteration
+def encrypt_words(ctx, p0, p1, p2, p3):
+    K = ctx.round_keys
+    T0, T1, T2, T3 = ctx.g_tables
+
+    # Input whitening
+    r0 = p0 ^ K[0]
+    r1 = p1 ^ K[1]
+    r2 = p2 ^ K[2]
+    r3 = p3 ^ K[3]
+
+    for r in range(8, 40, 4):
+        # Two rounds per iteration so the halves swap back in place
+        t0 = T0[r0 & 0xFF] ^ T1[(r0 >> 8) & 0xFF] ^ T2[(r0 >> 16) & 0xFF] ^ T3[r0 >> 24]
+        t1 = T0[r1 >> 24] ^ T1[r1 & 0xFF] ^ T2[(r1 >> 8) & 0xFF] ^ T3[(r1 >> 16) & 0xFF]
+        r2 ^= (t0 + t1 + K[r]) & 0xFFFFFFFF
+        r2 = (r2 >> 1) | ((r2 & 1) << 31)
+        r3 = (((r3 << 1) & 0xFFFFFFFF) | (r3 >> 31)) ^ ((t0 + 2 * t1 + K[r + 1]) & 0xFFFFFFFF)
+
+        t0 = T0[r2 & 0xFF] ^ T1[(r2 >> 8) & 0xFF] ^ T2[(r2 >> 16) & 0xFF] ^ T3[r2 >> 24]
+        t1 = T0[r3 >> 24] ^ T1[r3 & 0xFF] ^ T2[(r3 >> 8) & 0xFF] ^ T3[(r3 >> 16) & 0xFF]
+        r0 ^= (t0 + t1 + K[r + 2]) & 0xFFFFFFFF
+        r0 = (r0 >> 1) | ((r0 & 1) << 31)
+        r1 = (((r1 << 1) & 0xFFFFFFFF) | (r1 >> 31)) ^ ((t0 + 2 * t1 + K[r + 3]) & 0xFFFFFFFF)
+
+    # Undo the last swap and do the output whitening
+    return r2 ^ K[4], r3 ^ K[5], r0 ^ K[6], r1 ^ K[7]
+
+
+# Decrypt one block given as 4 little endian 32-bit words
+def decrypt_words(ctx, c0, c1, c2, c3):
+    K = ctx.round_keys
+    T0, T1, T2, T3 = ctx.g_tables
+
+    # Output whitening is undone first, in the swapped order
+    r2 = c0 ^ K[4]
+    r3 = c1 ^ K[5]
+    r0 = c2 ^ K[6]
+    r1 = c3 ^ K[7]
+
+    for r in range(36, 4, -4):
+        t0 = T0[r2 & 0xFF] ^ T1[(r2 >> 8) & 0xFF] ^ T2[(r2 >> 16) & 0xFF] ^ T3[r2 >> 24]
+        t1 = T0[r3 >> 24] ^ T1[r3 & 0xFF] ^ T2[(r3 >> 8) & 0xFF] ^ T3[(r3 >> 16) & 0xFF]
+        r0 = (((r0 << 1) & 0xFFFFFFFF) | (r0 >> 31)) ^ ((t0 + t1 + K[r + 2]) & 0xFFFFFFFF)
+        r1 ^= (t0 + 2 * t1 + K[r + 3]) & 0xFFFFFFFF
+        r1 = (r1 >> 1) | ((r1 & 1) << 31)
+
+        t0 = T0[r0 & 0xFF] ^ T1[(r0 >> 8) & 0xFF] ^ T2[(r0 >> 16) & 0xFF] ^ T3[r0 >> 24]
+        t1 = T0[r1 >> 24] ^ T1[r1 & 0xFF] ^ T2[(r1 >> 8) & 0xFF] ^ T3[(r1 >> 16) & 0xFF]
+        r2 = (((r2 << 1) & 0xFFFFFFFF) | (r2 >> 31)) ^ ((t0 + t1 + K[r]) & 0xFFFFFFFF)
+        r3 ^= (t0 + 2 * t1 + K[r + 1]) & 0xFFFFFFFF
+        r3 = (r3 >> 1) | ((r3 & 1) << 31)
+
+    # Input whitening
+    return r0 ^ K[0], r1 ^ K[1], r2 ^ K[2], r3 ^ K[3]
+
+
+# Encrypt a 16 byte block with the expanded key in ctx
+@instrumented()
+def encrypt_block(ctx, block):
+    return struct.pack('<4I', *encrypt_words(ctx, *struct.unpack('<4I', block)))
+
+
+# Decrypt a 16 byte block with the expanded key in ctx
+@instrumented()
+def decrypt_block(ctx, block):
+    return struct.pack('<4I', *decrypt_words(ctx, *struct.unpack('<4I', block)))
+
+
+# Encrypt function of Twofish on hex strings
+def encrypt(plaintext, key):
+    return encrypt_block(get_context(key), bytes.fromhex(plaintext)).hex()
+
+
+# Decryption fucntion on hex strings
+def decrypt(ciphertext, key):
+    return decrypt_block(get_context(key), bytes.fromhex(ciphertext)).hex()
+
+
+# Batched Twofish with NumPy for blocks that don't chain (ECB style batches, counter
+# keystream, many independent messages). The state is 4 uint32 columns, one row per
+# block, and each round of encrypt_words/decrypt_words runs over all rows at once.
+# uint32 arithmetic wraps by itself so the additions and rotations need no masks.
+
+# Returns the blocks as an (N, 4) uint32 array of little endian words and a function
+# that converts an array of that shape back to the type and shape of `blocks`
+def _block_words(np, blocks):
+    if isinstance(blocks, np.ndarray):
+        raw = np.ascontiguousarray(blocks)
+        words = raw.view(np.uint8).view('<u4').reshape(-1, 4)
+        return words, lambda out: out.astype('<u4').view(raw.dtype).reshape(raw.shape)
+    words = np.frombuffer(bytes(blocks), dtype='<u4').reshape(-1, 4)
+    return words, lambda out: out.astype('<u4').tobytes()
+
+
+def _np_tables(np, ctx):
+    T0, T1, T2, T3 = (np.array(T, dtype=np.uint32) for T in ctx.g_tables)
+    return np.array(ctx.round_keys, dtype=np.uint32), T0, T1, T2, T3
+
+
+# Encrypt N independent 16 byte blocks, `blocks` is bytes (a multiple of 16 long) or a
+# NumPy array whose buffer holds the blocks; the result has the same type and shape
+@instrumented()
+def encrypt_blocks(ctx, blocks):
+    import numpy as np  # optional dependency, only the batched path needs it
+
+    words, restore = _block_words(np, blocks)
+    K, T0, T1, T2, T3 = _np_tables(np, ctx)
+
+    # Input whitening
+    r0 = words[:, 0] ^ K[0]
+    r1 = words[:, 1] ^ K[1]
+    r2 = words[:, 2] ^ K[2]
+    r3 = words[:, 3] ^ K[3]
+
+    for r in range(8, 40, 4):
+        # F function of r0, r1 (g of r1 is taken after the 8 bit left rotation)
+        t0 = T0[r0 & 0xFF] ^ T1[(r0 >> 8) & 0xFF] ^ T2[(r0 >> 16) & 0xFF] ^ T3[r0 >> 24]
+        t1 = T0[r1 >> 24] ^ T1[r1 & 0xFF] ^ T2[(r1 >> 8) & 0xFF] ^ T3[(r1 >> 16) & 0xFF]
+        r2 = r2 ^ (t0 + t1 + K[r])
+        r2 = (r2 >> 1) | (r2 << 31)
+        r3 = ((r3 << 1) | (r3 >> 31)) ^ (t0 + t1 + t1 + K[r + 1])
+
+        t0 = T0[r2 & 0xFF] ^ T1[(r2 >> 8) & 0xFF] ^ T2[(r2 >> 16) & 0xFF] ^ T3[r2 >> 24]
+        t1 = T0[r3 >> 24] ^ T1[r3 & 0xFF] ^ T2[(r3 >> 8) & 0xFF] ^ T3[(r3 >> 16) & 0xFF]
+        r0 = r0 ^ (t0 + t1 + K[r + 2])
+        r0 = (r0 >> 1) | (r0 << 31)
+        r1 = ((r1 << 1) | (r1 >> 31)) ^ (t0 + t1 + t1 + K[r + 3])
+
+    # Undo the last swap and do the output whitening
+    out = np.stack([r2 ^ K[4], r3 ^ K[5], r0 ^ K[6], r1 ^ K[7]], axis=1)
+    return restore(out)
+
+
+# Decrypt N independent 16 byte blocks, the inverse of encrypt_blocks
+@instrumented()
+def decrypt_blocks(ctx, blocks):
+    import numpy as np  # optional dependency, only the batched path needs it
+
+    words, restore = _block_words(np, blocks)
+    K, T0, T1, T2, T3 = _np_tables(np, ctx)
+
+    # Output whitening is undone first, in the swapped order
+    r2 = words[:, 0] ^ K[4]
+    r3 = words[:, 1] ^ K[5]
+    r0 = words[:, 2] ^ K[6]
+    r1 = words[:, 3] ^ K[7]
+
+    for r in range(36, 4, -4):
+        t0 = T0[r2 & 0xFF] ^ T1[(r2 >> 8) & 0xFF] ^ T2[(r2 >> 16) & 0xFF] ^ T3[r2 >> 24]
+        t1 = T0[r3 >> 24] ^ T1[r3 & 0xFF] ^ T2[(r3 >> 8) & 0xFF] ^ T3[(r3 >> 16) & 0xFF]
+        r0 = ((r0 << 1) | (r0 >> 31)) ^ (t0 + t1 + K[r + 2])
+        r1 = r1 ^ (t0 + t1 + t1 + K[r + 3])
+        r1 = (r1 >> 1) | (r1 << 31)
+
+        t0 = T0[r0 & 0xFF] ^ T1[(r0 >> 8) & 0xFF] ^ T2[(r0 >> 16) & 0xFF] ^ T3[r0 >> 24]
+        t1 = T0[r1 >> 24] ^ T1[r1 & 0xFF] ^ T2[(r1 >> 8) & 0xFF] ^ T3[(r1 >> 16) & 0xFF]
+        r2 = ((r2 << 1) | (r2 >> 31)) ^ (t0 + t1 + K[r])
+        r3 = r3 ^ (t0 + t1 + t1 + K[r + 1])
+        r3 = (r3 >> 1) | (r3 << 31)
+
+    # Input whitening
+    out = np.stack([r0 ^ K[0], r1 ^ K[1], r2 ^ K[2], r3 ^ K[3]], axis=1)
+    return restore(out)
+
+
+# typ = input("Enter the type (Encrypt/Decrypt) : ")
+# key = input("Enter the key 128 bit (Hexadecimal) : ")
+# key = key.zfill(32)
+# if (typ.lower() == "encrypt"):
+#     plaintext = input("Enter the plaintext 128 bit (Hexadecimal) : ")
+#     plaintext = plaintext.zfill(32)
+#     print("The Ciphertext is : ", end=" ")
+#     print(encrypt(plaintext, key))
+#
+# else:
+#     Ciphertext = input("Enter the Ciphertext 128 bit (Hexadecimal) : ")
+#     print("The Decoded plaintext is : ", end=" ")
+#     print(decrypt(Ciphertext, key))
+#
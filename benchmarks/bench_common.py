@@ -0,0 +1,107 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The benchmarks import the library from the repository they are in
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+
+class KnownAnswerError(Exception):
+    pass
+
+
+def check(name, got, expected):
+    if got != expected:
+        raise KnownAnswerError("%s: got %s, expected %s" % (name, got, expected))
+
+
+def measure(function, repeat=5, min_time=0.2):
+    """
+    Seconds per call of function(): the median and the best of `repeat` runs,
+    each run calling it enough times to last about min_time.
+    """
+    timer = timeit.Timer(function)
+    number, elapsed = timer.autorange()
+    if number == 1 and elapsed >= min_time:
+        # Slow calls (large payloads): the calibration call counts as the first run
+        times = [elapsed] + timer.repeat(repeat=repeat - 1, number=1)
+    else:
+        number = max(1, int(number * min_time / elapsed))
+        times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {"seconds": statistics.median(times), "seconds_min": min(times), "calls": number * len(times)}
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {"commit": commit, "python": platform.python_version(), "implementation": platform.python_implementation(),
+            "machine": platform.machine(), "system": platform.system(), "cpus": os.cpu_count(),
+            "numpy": numpy_version, "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares the median time of every benchmark with the baseline run, returns the
+    lines of the report and whether one of them got slower by more than threshold.
+    """
+    before = {result["name"]: result for result in baseline["results"]}
+    lines = []
+    regressed = False
+    for result in results:
+        old = before.get(result["name"])
+        if old is None:
+            continue
+        ratio = result["seconds"] / old["seconds"]
+        slower = ratio > 1 + threshold
+        regressed = regressed or slower
+        lines.append("%-36s %12.3g s  %12.3g s  %+7.1f%%%s" % (result["name"], old["seconds"], result["seconds"],
+                                                                 (ratio - 1) * 100, "  REGRESSION" if slower else ""))
+    return lines, regressed
+
+
+def report(suite, results, args):
+    """
+    Writes the results as JSON (to args.output or stdout), compares them with
+    args.compare when given, and returns the exit status of the benchmark.
+    """
+    document = {"suite": suite, "environment": environment(), "results": results}
+    text = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        lines, regressed = compare(results, baseline, args.threshold)
+        print("%-36s %14s  %14s  %8s" % ("benchmark", "baseline", "current", "change"), file=sys.stderr)
+        for line in lines:
+            print(line, file=sys.stderr)
+        return 1 if regressed else 0
+    return 0
+
+
+def add_arguments(parser):
+    parser.add_argument("--output", "-o", help="file of the JSON results (default: stdout)")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown counted as a regression by --compare (default: 0.10 = 10%%)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark, the median is kept")
@@ -0,0 +1,153 @@
+import argparse
+import sys
+from collections import Counter
+from contextlib import contextmanager
+
+from bench_common import KnownAnswerError, add_arguments, check, measure, report
+
+import ecdsa.ecdsa_implementation as implementation
+from ecdsa.ecdsa_api import get_dsa, precompute_public_key, sign_digest, verify_digest
+from ecdsa.ecdsa_implementation import FiniteField, secp256k1
+
+# The vectors of ecdsa_implementation.test_dsa
+PRIVATE_KEY = 0x1234
+PUBLIC_KEY = (0x37a4aef1f8423ca076e4b7d99a8cabff40ddb8231f2a9f01081f15d7fa65c1ba,
+              0xb96ced90a1b8f9b43a18fc900ff55af2be0e94b90a434fca5b9e226b835024cd)
+SIGN_SECRET = 0x1111
+MESSAGES = [
+    (0x1234123412341234123412341234123412341234123412341234123412341234,
+     0x7592aab5d43618dda13fba71e3993cd7517a712d3da49664c06ee1bd3d1f70af,
+     0x8e578a508331374bcbb1618ea3a8c9c63d49e9d42e0ed605b8c74910cfa50c11),
+    (0x1111111111111111111111111111111111111111111111111111111111111111,
+     0x7592aab5d43618dda13fba71e3993cd7517a712d3da49664c06ee1bd3d1f70af,
+     0x351a200607d9aae72e3fb30fe41cf92dcd0b22117f57123df005974290d9429b),
+]
+
+# A full size scalar for the multiplications
+SCALAR = 0xc477f9f65c22cce20657faa5b2d1d8122336f851a508a1ed04e479c34985bf96
+
+
+def known_answer_tests():
+    # The plain curve and the one with the doublings table of G must give the same answers
+    for name, dsa in (("secp256k1", secp256k1()), ("get_dsa", get_dsa())):
+        public_key = dsa.calcpub(PRIVATE_KEY)
+        check("%s pubkey" % name, (int(public_key.x), int(public_key.y)), PUBLIC_KEY)
+        for message, r, s in MESSAGES:
+            signature = dsa.sign(message, PRIVATE_KEY, SIGN_SECRET)
+            check("%s signature" % name, tuple(int(part) for part in signature), (r, s))
+            check("%s verify" % name, dsa.verify(message, public_key, r, s), True)
+            check("%s verify wrong message" % name, dsa.verify(message + 1, public_key, r, s), False)
+
+        (message1, r, s1), (message2, _, s2) = MESSAGES
+        secret, private_key = dsa.crack2(r, s1, s2, message1, message2)
+        check("%s crack2" % name, (int(secret), int(private_key)), (SIGN_SECRET, PRIVATE_KEY))
+
+    # ecdsa_api on digests, with and without the doublings table of the public key
+    digest = MESSAGES[0][0].to_bytes(32, 'big')
+    public_key = get_dsa().calcpub(PRIVATE_KEY)
+    check("sign_digest", tuple(int(part) for part in sign_digest(digest, PRIVATE_KEY, SIGN_SECRET)),
+          MESSAGES[0][1:])
+    check("verify_digest", verify_digest(digest, public_key, MESSAGES[0][1:]), True)
+    precompute_public_key(public_key)
+    check("verify_digest with table", verify_digest(digest, public_key, MESSAGES[0][1:]), True)
+
+
+@contextmanager
+def operation_counters():
+    """
+    Counts the field operations done in the with statement (add, sub, mul, div
+    and pow), the modinv and GCD calls behind every inversion, and the
+    FiniteField.Value allocations. The library is only
+    patched while counting, the timed runs don't pay for it.
+    """
+    counts = Counter()
+
+    def counted(name, function):
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return function(*args, **kwargs)
+        return wrapper
+
+    patches = [(FiniteField, "add", "field_add"), (FiniteField, "sub", "field_sub"),
+               (FiniteField, "mul", "field_mul"), (FiniteField, "div", "field_div"),
+               (FiniteField, "pow", "field_pow"), (FiniteField.Value, "__init__", "value_allocs"),
+               (implementation, "modinv", "modinv"), (implementation, "GCD", "gcd")]
+    originals = [(owner, attribute, getattr(owner, attribute)) for owner, attribute, _ in patches]
+    for owner, attribute, name in patches:
+        setattr(owner, attribute, counted(name, getattr(owner, attribute)))
+    try:
+        yield counts
+    finally:
+        for owner, attribute, original in originals:
+            setattr(owner, attribute, original)
+
+
+def benchmark(name, function, args):
+    result = dict(measure(function, args.repeat), name=name)
+    if args.counters:
+        with operation_counters() as counts:
+            function()
+        result["counters"] = dict(counts)
+    return result
+
+
+def benchmarks(args):
+    plain = secp256k1()
+    dsa = get_dsa()
+    message, r, s = MESSAGES[0]
+    digest = message.to_bytes(32, 'big')
+    public_key = dsa.calcpub(PRIVATE_KEY)
+    plain_public_key = plain.calcpub(PRIVATE_KEY)
+    public_key_table = dsa.ec.doublings(public_key)
+    # verify_digest finds this table by the public key, as after precompute_public_key in the project
+    precompute_public_key(public_key, [(int(point.x), int(point.y)) for point in public_key_table])
+
+    GFp = plain.ec.field
+    a, b = GFp.value(plain.G.x), GFp.value(plain.G.y)
+
+    return [
+        # FiniteField operations on values of the secp256k1 prime field
+        benchmark("field_add", lambda: a + b, args),
+        benchmark("field_mul", lambda: a * b, args),
+        benchmark("field_inverse", lambda: a.inverse(), args),
+        benchmark("field_div", lambda: a // b, args),
+
+        benchmark("point_add", lambda: plain.G + plain_public_key, args),
+        benchmark("point_double", lambda: plain.G + plain.G, args),
+        benchmark("ec_mul", lambda: plain.ec.mul(plain.G, SCALAR), args),
+        benchmark("ec_mul_table", lambda: dsa.ec.mul_table(dsa.G_table, SCALAR), args),
+        benchmark("doublings", lambda: dsa.ec.doublings(dsa.G), args),
+
+        benchmark("calcpub", lambda: plain.calcpub(SCALAR), args),
+        benchmark("calcpub_table", lambda: dsa.calcpub(SCALAR), args),
+        benchmark("sign", lambda: plain.sign(message, PRIVATE_KEY, SIGN_SECRET), args),
+        benchmark("sign_table", lambda: dsa.sign(message, PRIVATE_KEY, SIGN_SECRET), args),
+        benchmark("verify", lambda: plain.verify(message, plain_public_key, r, s), args),
+        benchmark("verify_table", lambda: dsa.verify(message, public_key, r, s), args),
+        benchmark("verify_public_key_table",
+                  lambda: dsa.verify(message, public_key, r, s, pubkey_table=public_key_table), args),
+
+        # ecdsa_api, as the rest of the project calls it
+        benchmark("sign_digest", lambda: sign_digest(digest, PRIVATE_KEY, SIGN_SECRET), args),
+        benchmark("verify_digest", lambda: verify_digest(digest, public_key, (r, s)), args),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ECDSA and finite field benchmarks, gated on the test_dsa vectors")
+    add_arguments(parser)
+    parser.add_argument("--counters", action="store_true",
+                        help="also count field multiplications, inversions and Value allocations per operation")
+    args = parser.parse_args(argv)
+
+    # A change that breaks the curve arithmetic fails here, before anything is timed
+    try:
+        known_answer_tests()
+    except KnownAnswerError as error:
+        print("Known answer test failed: %s" % error, file=sys.stderr)
+        return 2
+    return report("ecdsa", benchmarks(args), args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
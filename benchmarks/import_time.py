@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Import time budgets in milliseconds. They assume the bytecode cache is written, the first
+# (warm-up) run of every module compiles it and isn't counted.
+IMPORT_BUDGETS = {
+    "Twofish": 25,
+    "CipherModes": 35,
+    "ImageContainer": 40,
+    "KeyStore": 45,
+    "OutputCache": 20,
+    "ReceivePipeline": 45,
+    "main": 60,
+}
+
+# Modules that importing the library must not load, they are imported by the functions that use them
+HEAVY_MODULES = ("PIL", "gmpy2", "numpy", "multiprocessing", "concurrent.futures.process")
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter, prints the import time and the heavy modules that got loaded
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import %s
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def probe(module):
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    output = subprocess.run([sys.executable, "-c", PROBE % (module, HEAVY_MODULES)], cwd=REPO_DIR, env=env,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def measure(module, runs):
+    probe(module)
+    results = [probe(module) for _ in range(runs)]
+    loaded = sorted(set(name for result in results for name in result["loaded"]))
+    return statistics.median(result["ms"] for result in results), loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import time of the library modules against their budgets")
+    parser.add_argument("--runs", type=int, default=7, help="measured runs per module (after one warm-up run)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = {}
+    failed = False
+    for module, budget in IMPORT_BUDGETS.items():
+        ms, loaded = measure(module, args.runs)
+        ok = ms <= budget and not loaded
+        failed = failed or not ok
+        results[module] = {"ms": round(ms, 2), "budget_ms": budget, "heavy_modules": loaded, "ok": ok}
+        if not args.json:
+            print("%-16s %7.2f ms  (budget %d ms)%s%s" % (module, ms, budget,
+                                                         "  loads " + ", ".join(loaded) if loaded else "",
+                                                         "" if ok else "  FAIL"))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+from itertools import repeat
+
+from bench_common import KnownAnswerError, add_arguments, check, measure, report
+
+from CipherModes import ctr_encrypt_bytes, ofb_encrypt_bytes, ofb_encrypt_stream
+from Twofish import (TwofishContext, decrypt, decrypt_block, encrypt, encrypt_block, encrypt_blocks, get_context,
+                     key_schedule)
+
+# Twofish-128 known answers from the published ECB_TBL.TXT: every step encrypts the last
+# ciphertext with the plaintext before it as the key, starting from a zero key and block
+KNOWN_ANSWERS = {
+    1: "9f589f5cf6122c32b6bfec2f2ae8c35a",
+    2: "d491db16e7b1c39e86cb086b789f5419",
+    3: "019f9809de1711858faac3a3ba20fbc3",
+    49: "5d9d4eeffa9151575524f115815a12e0",
+}
+
+KEY = "000102030405060708090a0b0c0d0e0f"
+IV = bytes(range(16, 32))
+
+# OFB payload sizes, 16 B up to --max-size in steps of 16x
+OFB_CHUNK_SIZE = 1 << 16
+DEFAULT_MAX_SIZE = 16 << 20
+
+
+def known_answer_tests():
+    key = plaintext = "0" * 32
+    for step in range(1, max(KNOWN_ANSWERS) + 1):
+        ciphertext = encrypt(plaintext, key)
+        if step in KNOWN_ANSWERS:
+            check("ECB_TBL step %d" % step, ciphertext, KNOWN_ANSWERS[step])
+        check("decrypt step %d" % step, decrypt(ciphertext, key), plaintext)
+        key, plaintext = plaintext, ciphertext
+
+    # The modes against OFB built block by block from the checked block cipher
+    ctx = get_context(KEY)
+    data = bytes(range(256)) * 4 + b'partial'
+    block, keystream = IV, []
+    for _ in range((len(data) + 15) // 16):
+        block = encrypt_block(ctx, block)
+        keystream.append(block)
+    expected = bytes(a ^ b for a, b in zip(data, b''.join(keystream)))
+    check("ofb_encrypt_bytes", ofb_encrypt_bytes(data, KEY, IV), expected)
+    check("ofb_encrypt_stream", b''.join(ofb_encrypt_stream([data[:100], data[100:]], KEY, IV)), expected)
+
+    container_round_trip()
+
+    # The NumPy batch engine against the single block one
+    blocks = bytes(range(256))
+    try:
+        batched = encrypt_blocks(ctx, blocks)
+    except ImportError:
+        return
+    check("encrypt_blocks", batched, b''.join(encrypt_block(ctx, blocks[i:i + 16]) for i in range(0, 256, 16)))
+
+
+def container_round_trip():
+    # An image container encrypted with a random bytes key only decrypts with that key
+    try:
+        from PIL import Image
+    except ImportError:
+        return
+    from ImageContainer import decrypt_range, process_image
+
+    key, wrong_key = os.urandom(16), os.urandom(16)
+    pixels = os.urandom(32 * 8)
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(sys.stderr):
+        image_path = os.path.join(directory, "image.png")
+        container_path = os.path.join(directory, "image.tfim")
+        Image.frombytes("L", (32, 8), pixels).save(image_path)
+
+        process_image("encrypt", key, IV, image_path, container_path)
+        check("container round trip", process_image("decrypt", key, IV, container_path, None).tobytes(), pixels)
+        check("container decrypt_range", decrypt_range(container_path, key, 40, 100), pixels[40:140])
+        wrong = process_image("decrypt", wrong_key, IV, container_path, None).tobytes()
+        check("container wrong key", wrong != pixels, True)
+
+
+def parse_size(text):
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    if text[-1:].upper() in units:
+        return int(text[:-1]) * units[text[-1:].upper()]
+    return int(text)
+
+
+def result(name, stats, size=None):
+    stats = dict(stats, name=name)
+    if size is not None:
+        stats["bytes"] = size
+        stats["mb_per_s"] = size / stats["seconds"] / 1e6
+    return stats
+
+
+def ofb_stream(size):
+    # Large payloads go through the streaming API so they are never held in memory
+    chunk = os.urandom(OFB_CHUNK_SIZE)
+    chunks = repeat(chunk, size // OFB_CHUNK_SIZE)
+    for _ in ofb_encrypt_stream(chunks, KEY, IV, chunk_size=OFB_CHUNK_SIZE):
+        pass
+
+
+def benchmarks(args):
+    ctx = get_context(KEY)
+    block = bytes(16)
+    results = [
+        result("encrypt_block", measure(lambda: encrypt_block(ctx, block), args.repeat)),
+        result("decrypt_block", measure(lambda: decrypt_block(ctx, block), args.repeat)),
+        # The hex API, with the expanded key coming from the get_context cache
+        result("encrypt_hex", measure(lambda: encrypt("0" * 32, KEY), args.repeat)),
+        result("decrypt_hex", measure(lambda: decrypt("0" * 32, KEY), args.repeat)),
+        result("key_schedule", measure(lambda: key_schedule(KEY), args.repeat)),
+        # Key schedule plus the full keying tables, what a cache miss of get_context costs
+        result("key_setup", measure(lambda: TwofishContext(KEY), args.repeat)),
+    ]
+
+    size = 16
+    while size <= args.max_size:
+        if size < OFB_CHUNK_SIZE * 16:
+            data = os.urandom(size)
+            stats = measure(lambda: ofb_encrypt_bytes(data, KEY, IV), args.repeat)
+            results.append(result("ofb_encrypt_bytes/%d" % size, stats, size))
+        else:
+            # Payloads of megabytes take seconds, a few runs are enough
+            stats = measure(lambda: ofb_stream(size), min(args.repeat, 3))
+            results.append(result("ofb_encrypt_stream/%d" % size, stats, size))
+        size *= 16
+
+    # CTR in one process, its keystream goes through the NumPy batch engine when NumPy is there
+    data = os.urandom(1 << 20)
+    stats = measure(lambda: ctr_encrypt_bytes(data, KEY, IV, workers=1), args.repeat)
+    results.append(result("ctr_encrypt_bytes/%d" % len(data), stats, len(data)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Twofish block, key schedule and OFB benchmarks, gated on "
+                                                 "the Twofish-128 known answer tests")
+    add_arguments(parser)
+    parser.add_argument("--max-size", type=parse_size, default=DEFAULT_MAX_SIZE,
+                        help="largest OFB payload, e.g. 256M (default: 16M)")
+    args = parser.parse_args(argv)
+
+    # A change that breaks the cipher fails here, before anything is timed
+    try:
+        known_answer_tests()
+    except KnownAnswerError as error:
+        print("Known answer test failed: %s" % error, file=sys.stderr)
+        return 2
+    return report("twofish", benchmarks(args), args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,43 +1,124 @@
 
 import hashlib
 import os
+from Instrumentation import instrumented
 from ecdsa.ecdsa_implementation import *
 
 
 # Assume all other required imports and initializations are done here
 # including Two Fish encryption/decryption setup and Merkle Hellman setup
 
-def sign_image(image_path, private_key, signsecret):
-    # Load the encrypted image
+# Size of the reads when hashing a file
+HASH_CHUNK_SIZE = 1 << 20
+
+# One secp256k1 object per process, points of different curve objects don't mix
+_dsa = None
+
+# Doublings tables of the public keys given to precompute_public_key, by (x, y)
+_public_key_tables = {}
+
+
+def get_dsa():
+    # The curve with the doublings table of its generator, built on first use
+    global _dsa
+    if _dsa is None:
+        _dsa = secp256k1()
+    if _dsa.G_table is None:
+        _dsa.G_table = _dsa.ec.doublings(_dsa.G)
+    return _dsa
+
+
+def use_base_table(pairs):
+    # Installs a doublings table of the generator computed earlier, as (x, y) pairs
+    global _dsa
+    if _dsa is None:
+        _dsa = secp256k1(pairs)
+    else:
+        _dsa.G_table = [_dsa.ec.point(x, y) for x, y in pairs]
+
+
+def point_pairs(points):
+    return [(int(point.x), int(point.y)) for point in points]
+
+
+def public_key_point(x, y):
+    # A public key given by its coordinates, on the curve of get_dsa
+    return get_dsa().ec.point(x, y)
+
+
+def precompute_public_key(public_key, table=None):
+    # Keeps a doublings table of a public key (computed, or given as (x, y) pairs),
+    # verify_digest uses it for every signature checked against that key
+    dsa = get_dsa()
+    if table is None:
+        table = dsa.ec.doublings(public_key_point(int(public_key.x), int(public_key.y)))
+    else:
+        table = [dsa.ec.point(x, y) for x, y in table]
+    _public_key_tables[(int(public_key.x), int(public_key.y))] = table
+    return table
+
+
+def hash_file(image_path):
+    # SHA-256 of a file, read in chunks so the file is never held in memory
+    image_hash = hashlib.sha256()
     with open(image_path, 'rb') as image_file:
-        image_data = image_file.read()
+        for chunk in iter(lambda: image_file.read(HASH_CHUNK_SIZE), b''):
+            image_hash.update(chunk)
+    return image_hash.digest()
+
 
-    # Hash the image data
-    image_hash = int(hashlib.sha256(image_data).hexdigest(), 16)
+@instrumented()
+def sign_digest(digest, private_key, signsecret):
+    # Sign a SHA-256 digest that was already computed, e.g. while the file was written
+    image_hash = int.from_bytes(digest, 'big')
 
     # Sign the hash
-    dsa = secp256k1()
+    dsa = get_dsa()
     r, s = dsa.sign(image_hash, private_key, signsecret)
 
     return r, s
 
 
-def verify_signature(image_path, public_key, signature):
-    # Load the encrypted image
-    with open(image_path, 'rb') as image_file:
-        image_data = image_file.read()
+def verify_cache_args(digest, public_key, signature):
+    # The OutputCache entry of the result of verifying `signature` of `digest` with `public_key`
+    return ("verify", digest, "%x,%x" % (int(public_key.x), int(public_key.y)),
+            "%x,%x" % tuple(int(part) for part in signature))
+
+
+@instrumented()
+def verify_digest(digest, public_key, signature, cache=None):
+    # Verify a signature against a SHA-256 digest that was already computed
+    # With a cache (an OutputCache) the result for the same digest, key and signature is reused
+    if cache is not None:
+        cache_args = verify_cache_args(digest, public_key, signature)
+        cached = cache.get(*cache_args)
+        if cached is not None:
+            return cached == b'\1'
 
-    # Hash the image data
-    image_hash = int(hashlib.sha256(image_data).hexdigest(), 16)
+    image_hash = int.from_bytes(digest, 'big')
 
     # Verify the signature
-    dsa = secp256k1()
-    verification_result = dsa.verify(image_hash, public_key, *signature)
+    dsa = get_dsa()
+    table = _public_key_tables.get((int(public_key.x), int(public_key.y)))
+    verification_result = dsa.verify(image_hash, public_key, *signature, pubkey_table=table)
 
+    if cache is not None:
+        cache.put(*cache_args, b'\1' if verification_result else b'\0')
     return verification_result
 
+
+def sign_image(image_path, private_key, signsecret):
+    # Hash the encrypted image and sign the hash
+    return sign_digest(hash_file(image_path), private_key, signsecret)
+
+
+def verify_signature(image_path, public_key, signature, cache=None):
+    # Hash the encrypted image and verify the signature
+    return verify_digest(hash_file(image_path), public_key, signature, cache)
+
+
 def get_pub_key_by_prvt_key(prvt_key):
-    dsa = secp256k1()
+    dsa = get_dsa()
     return dsa.calcpub(prvt_key)
 
 
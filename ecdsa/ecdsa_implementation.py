@@ -271,6 +271,31 @@ class EllipticCurve:
 
         return accumulator
 
+    def doublings(self, pt, count=256):
+        """
+        precompute pt*2^i for i in range(count)
+        with this table a multiplication by a scalar below 2^count
+        only needs the additions, see mul_table
+        """
+        table = [pt]
+        for _ in range(count - 1):
+            table.append(table[-1] + table[-1])
+        return table
+
+    def mul_table(self, table, scalar):
+        """
+        scalar multiplication using a table of doublings of a point
+        """
+        scalar = int(scalar)
+        if scalar.bit_length() > len(table):
+            return self.mul(table[0], scalar)
+
+        accumulator = self.zero()
+        for i in range(scalar.bit_length()):
+            if (scalar >> i) & 1:
+                accumulator += table[i]
+        return accumulator
+
     def div(self, pt, scalar):
         """
         scalar division:  P / a = P * (1/a)
@@ -322,17 +347,27 @@ class ECDSA:
     Digital Signature Algorithm using Elliptic Curves
     """
 
-    def __init__(self, ec, G, n):
+    def __init__(self, ec, G, n, G_table=None):
         self.ec = ec
         self.G = G
         self.GFn = FiniteField(n)
+        # optional table of doublings of G, see EllipticCurve.doublings
+        self.G_table = G_table
+
+    def mulG(self, scalar):
+        """
+        return G*scalar, using the doublings table of G when there is one
+        """
+        if self.G_table is None:
+            return self.G * scalar
+        return self.ec.mul_table(self.G_table, scalar)
 
     def calcpub(self, privkey):
         """
         calculate the public key for private key x
         return G*x
         """
-        return self.G * self.GFn.value(privkey)
+        return self.mulG(self.GFn.value(privkey))
 
     def sign(self, message, privkey, secret):
         """
@@ -344,17 +379,18 @@ class ECDSA:
         x = self.GFn.value(privkey)
         k = self.GFn.value(secret)
 
-        R = self.G * k
+        R = self.mulG(k)
 
         r = self.GFn.value(R.x)
         s = (m + x * r) // k
 
         return (r, s)
 
-    def verify(self, message, pubkey, rnum, snum):
+    def verify(self, message, pubkey, rnum, snum, pubkey_table=None):
         """
         Verify the signature
         for message m, pubkey Y, signature (r,s)
+        pubkey_table is an optional table of doublings of Y
         r = xcoord(R)
         verify that :  G*m+Y*r=R*s
         this is true because: { Y=G*x, and R=G*k, s=(m+x*r)/k }
@@ -371,7 +407,10 @@ class ECDSA:
         r = self.GFn.value(rnum)
         s = self.GFn.value(snum)
 
-        R = self.G * (m // s) + pubkey * (r // s)
+        if pubkey_table is None:
+            R = self.mulG(m // s) + pubkey * (r // s)
+        else:
+            R = self.mulG(m // s) + self.ec.mul_table(pubkey_table, r // s)
 
         # alternative methods of verifying
         # RORG = self.ec.decompress(r, 0)
@@ -445,16 +484,19 @@ class ECDSA:
         return (s * k - m) // r
 
 
-def secp256k1():
+def secp256k1(G_table=None):
     """
     create the secp256k1 curve
+    G_table is an optional list of (x, y) pairs of the doublings of the generator
     """
     GFp = FiniteField(2 ** 256 - 2 ** 32 - 977)
     ec = EllipticCurve(GFp, 0, 7)
     generator = ec.point(0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
                          0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8)
     grouporder = 2 ** 256 - 432420386565659656852420866394968145599
-    return ECDSA(ec, generator, grouporder)
+    if G_table is not None:
+        G_table = [ec.point(x, y) for x, y in G_table]
+    return ECDSA(ec, generator, grouporder, G_table)
 
 
 def verifytest(calced, expected, descr):